@@ -0,0 +1,269 @@
+import os
+import re
+import math
+import hashlib
+import threading
+from agentic_copilot.retrieval.tokenize import tokenize
+
+# Context token budgets for the final reasoning prompt, per model.
+# Well below the context windows: past this size answers get slower and
+# more expensive without getting better.
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-4o": 24000,
+    "gpt-4o-mini": 16000,
+    "gpt-4.1": 32000,
+    "gpt-4.1-mini": 24000,
+}
+DEFAULT_CONTEXT_BUDGET = 16000
+
+# Blocks smaller than this are dropped rather than truncated into uselessness
+MIN_TRUNCATED_BLOCK_TOKENS = 200
+TRUNCATION_MARKER = "\n... [truncated to fit context budget]"
+# The top-ranked block is packed first; one that does not fit whole is truncated to this share of the budget
+TOP_BLOCK_MAX_SHARE = 0.6
+# Blocks that do not fit whole are summarized (heading + query-matching lines) into at most this many tokens
+SUMMARY_MAX_TOKENS = 120
+SUMMARY_MAX_LINES = 8
+SUMMARY_MARKER = "\n... [summarized to fit context budget]"
+SECTION_SEPARATOR = "\n\n"
+KEPT_BLOCK_SEPARATOR = "\n\n---\n\n"
+
+# Retrieval renderers separate entities/sections with a bare "---" line. Only that
+# exact line outside ``` fences splits blocks: staged sources carry a longer dash
+# rule in their header, and code may contain anything.
+BLOCK_SEPARATOR = "---"
+_FENCE_RE = re.compile(r"^\s*```")
+
+
+def split_blocks(text):
+    """Splits rendered context into blocks on separator lines outside code fences."""
+    blocks = []
+    current = []
+    in_fence = False
+    for line in text.split("\n"):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and line.strip() == BLOCK_SEPARATOR:
+            blocks.append("\n".join(current))
+            current = []
+            continue
+        current.append(line)
+    blocks.append("\n".join(current))
+    return blocks
+
+
+def _close_fences(text):
+    """Closes a ``` fence left open by truncation."""
+    fences = sum(1 for line in text.split("\n") if _FENCE_RE.match(line))
+    return text + "\n```" if fences % 2 else text
+
+_QUERY_STOP_WORDS = {
+    'the', 'is', 'are', 'was', 'were', 'about', 'this', 'that', 'with', 'for', 'and', 'or', 'but',
+    'not', 'can', 'will', 'from', 'has', 'have', 'had', 'does', 'did', 'why', 'what', 'how', 'when',
+    'where', 'who', 'give', 'show', 'me', 'all', 'list', 'code', 'explain', 'work', 'works',
+}
+
+_encoding_lock = threading.Lock()
+_encodings = {}
+
+
+def _get_encoding(model):
+    """tiktoken encoding for the model, or None if it cannot be loaded (e.g. offline)."""
+    with _encoding_lock:
+        if model in _encodings:
+            return _encodings[model]
+        encoding = None
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"⚠️  tiktoken unavailable ({type(e).__name__}); estimating tokens from length")
+        _encodings[model] = encoding
+        return encoding
+
+
+def get_context_budget(model):
+    """Token budget for the model, overridable with FINAL_CONTEXT_TOKEN_BUDGET."""
+    override = os.environ.get("FINAL_CONTEXT_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    return MODEL_CONTEXT_BUDGETS.get(model, DEFAULT_CONTEXT_BUDGET)
+
+
+class ContextBudgeter:
+    """
+    Assembles the final reasoning context under a token budget.
+
+    Context items are split into blocks (one per entity/section), deduplicated
+    and ranked by overlap with the query. The top-ranked block is placed first
+    (truncated to TOP_BLOCK_MAX_SHARE of the budget if it is too large), the rest
+    are packed greedily, blocks that did not fit are summarized down to their
+    heading and query-matching lines, and the best block still left out is
+    truncated into whatever space remains. Section headers and separators count
+    against the budget. Kept blocks are emitted in their original order so the
+    prompt still reads naturally.
+    """
+
+    def __init__(self, model="gpt-4o", budget=None):
+        self.model = model
+        self.budget = budget if budget is not None else get_context_budget(model)
+        self.encoding = _get_encoding(model)
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text, max_tokens):
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[: max_tokens * 4]
+
+    def _score(self, query_tokens, block):
+        if not query_tokens:
+            return 0.0
+        block_tokens = tokenize(block)
+        hits = len(query_tokens & block_tokens)
+        # Matches in markdown headings (entity titles) count double
+        headings = [line for line in block.split("\n") if line.startswith("#")]
+        heading = " ".join(headings) if headings else block.lstrip().split("\n", 1)[0]
+        heading_hits = len(query_tokens & tokenize(heading))
+        return hits + heading_hits
+
+    def _cut(self, block, max_tokens):
+        """Truncates a block to max_tokens including the marker and a closing fence."""
+        cut = self.truncate(block, max_tokens - self.count(TRUNCATION_MARKER) - self.count("\n```"))
+        return _close_fences(cut) + TRUNCATION_MARKER
+
+    def summarize(self, query_tokens, block):
+        """
+        Extractive summary of a block: its heading / bold field lines plus the lines
+        that mention the query, without code fences. None if nothing useful is left.
+        """
+        lines = [line for line in block.split("\n") if line.strip() and not _FENCE_RE.match(line)]
+        if not lines:
+            return None
+        picked = [lines[0]]
+        for line in lines[1:]:
+            if len(picked) >= SUMMARY_MAX_LINES:
+                break
+            stripped = line.lstrip()
+            if stripped.startswith(("#", "**")) or (query_tokens & tokenize(line)):
+                picked.append(line)
+        if len(picked) == 1 and len(lines) > 1:
+            picked.append(lines[1])
+        summary = "\n".join(picked)
+        max_tokens = SUMMARY_MAX_TOKENS - self.count(SUMMARY_MARKER)
+        if self.count(summary) > max_tokens:
+            summary = self.truncate(summary, max_tokens)
+        return summary + SUMMARY_MARKER
+
+    def assemble(self, query, sections):
+        """
+        sections: list of (label, items) in priority order.
+        Returns (context_text, report) where report includes dropped_tokens.
+        """
+        query_tokens = {t for t in tokenize(query) if len(t) > 2 and t not in _QUERY_STOP_WORDS}
+
+        blocks = []  # (section_idx, position, text, tokens, score)
+        seen = set()
+        duplicates = 0
+        input_tokens = 0
+        position = 0
+        for section_idx, (_, items) in enumerate(sections):
+            for item in items:
+                for block in split_blocks(str(item)):
+                    block = block.strip()
+                    if not block:
+                        continue
+                    tokens = self.count(block)
+                    input_tokens += tokens
+                    digest = hashlib.sha1(" ".join(block.split()).encode("utf-8")).hexdigest()
+                    if digest in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(digest)
+                    blocks.append((section_idx, position, block, tokens, self._score(query_tokens, block)))
+                    position += 1
+
+        # Highest score first; earlier sections and earlier blocks win ties
+        ranked = sorted(blocks, key=lambda b: (-b[4], b[0], b[1]))
+
+        # Layout cost of adding a block: the section header for a section's first block, else a separator
+        header_tokens = [self.count(f"**{label}:**\n") + self.count(SECTION_SEPARATOR) for label, _ in sections]
+        separator_tokens = self.count(KEPT_BLOCK_SEPARATOR)
+        open_sections = set()
+        remaining = self.budget
+        kept = {}  # position -> (section_idx, text)
+        kept_input_tokens = 0
+        counts = {"truncated": 0, "summarized": 0}
+
+        def overhead(section_idx):
+            return separator_tokens if section_idx in open_sections else header_tokens[section_idx]
+
+        def keep(section_idx, pos, text, tokens, source_tokens, kind=None):
+            nonlocal remaining, kept_input_tokens
+            remaining -= tokens + overhead(section_idx)
+            open_sections.add(section_idx)
+            kept[pos] = (section_idx, text)
+            kept_input_tokens += source_tokens
+            if kind:
+                counts[kind] += 1
+
+        leftovers = []
+        for rank, (section_idx, pos, block, tokens, _) in enumerate(ranked):
+            cost = tokens + overhead(section_idx)
+            if cost <= remaining:
+                keep(section_idx, pos, block, tokens, tokens)
+            elif rank == 0 and self.budget * TOP_BLOCK_MAX_SHARE >= MIN_TRUNCATED_BLOCK_TOKENS:
+                # The best match is never crowded out by smaller, lower-ranked blocks
+                share = int(self.budget * TOP_BLOCK_MAX_SHARE) - overhead(section_idx)
+                cut = self._cut(block, share)
+                cut_tokens = self.count(cut)
+                keep(section_idx, pos, cut, cut_tokens, min(cut_tokens, tokens), "truncated")
+            else:
+                leftovers.append((section_idx, pos, block, tokens))
+
+        # Summaries of the blocks that did not fit, best first, while they fit
+        not_summarized = []
+        for section_idx, pos, block, tokens in leftovers:
+            summary = self.summarize(query_tokens, block)
+            summary_tokens = self.count(summary) if summary else 0
+            if summary and summary_tokens < tokens and summary_tokens + overhead(section_idx) <= remaining:
+                keep(section_idx, pos, summary, summary_tokens, summary_tokens, "summarized")
+            else:
+                not_summarized.append((section_idx, pos, block, tokens))
+
+        # Then truncate the best-ranked block still left out into the remaining space
+        if not_summarized:
+            section_idx, pos, block, tokens = not_summarized[0]
+            space = remaining - overhead(section_idx)
+            if space >= MIN_TRUNCATED_BLOCK_TOKENS:
+                cut = self._cut(block, space)
+                cut_tokens = self.count(cut)
+                keep(section_idx, pos, cut, cut_tokens, min(cut_tokens, tokens), "truncated")
+
+        context_parts = []
+        for section_idx, (label, _) in enumerate(sections):
+            section_blocks = [kept[p][1] for p in sorted(kept) if kept[p][0] == section_idx]
+            if section_blocks:
+                context_parts.append(f"**{label}:**\n" + KEPT_BLOCK_SEPARATOR.join(section_blocks))
+
+        context = SECTION_SEPARATOR.join(context_parts) if context_parts else "No data available."
+        report = {
+            "model": self.model,
+            "budget": self.budget,
+            "input_tokens": input_tokens,
+            "used_tokens": self.count(context) if kept else 0,
+            "dropped_tokens": max(input_tokens - kept_input_tokens, 0),
+            "blocks_total": len(blocks) + duplicates,
+            "blocks_kept": len(kept),
+            "blocks_truncated": counts["truncated"],
+            "blocks_summarized": counts["summarized"],
+            "duplicates_removed": duplicates,
+            "exact_token_counts": self.encoding is not None,
+        }
+        return context, report
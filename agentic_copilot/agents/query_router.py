@@ -0,0 +1,326 @@
+import os
+import re
+import math
+import json
+from collections import Counter, defaultdict
+from agentic_copilot.cache.lru_cache import PersistentLRUCache, CACHE_DIR, normalize_query, make_key, prompt_hash
+
+# Label sets shared with the rest of the pipeline
+INTENTS = ["explain", "refactor", "debug", "impact_analysis", "general"]
+SEARCH_METHODS = ["local", "global", "community"]
+
+DEFAULT_ROUTE = {
+    "intent": "general",
+    "search_method": "local",
+}
+
+# Minimum posterior probability for the local classifier to answer without an LLM call
+LOCAL_CONFIDENCE_THRESHOLD = 0.9
+ROUTER_LLM_MODEL = "gpt-4o-mini"
+
+# Memoized LLM routes (temperature-0 calls on tiny prompts repeat a lot)
+ROUTER_CACHE_MAX_ENTRIES = int(os.environ.get("ROUTER_CACHE_MAX_ENTRIES", "4096"))
+ROUTER_CACHE_TTL_SECONDS = int(os.environ.get("ROUTER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Labelled examples: (query, intent, search_method)
+LABELLED_EXAMPLES = [
+    # project overview / features -> community
+    ("what is this project about", "explain", "community"),
+    ("what is the project about", "explain", "community"),
+    ("what does this project do", "explain", "community"),
+    ("what does this system do", "explain", "community"),
+    ("what are the key features", "explain", "community"),
+    ("what are the main features of this codebase", "explain", "community"),
+    ("what functionality is available", "explain", "community"),
+    ("what capabilities does the app provide", "explain", "community"),
+    ("give me an overview of the project", "explain", "community"),
+    ("summarize this repository", "explain", "community"),
+    ("what business problems does this solve", "explain", "community"),
+    # list all -> community-level breadth
+    ("list all apex classes", "general", "community"),
+    ("what all apex classes are there", "general", "community"),
+    ("give me all apex classes", "general", "community"),
+    ("list all test classes", "general", "community"),
+    ("show me all test classes", "general", "community"),
+    ("give me all xml files", "general", "community"),
+    ("list all custom objects", "general", "community"),
+    ("name of all sobjects", "general", "community"),
+    ("list all lwc components", "general", "community"),
+    ("show all lightning web components", "general", "community"),
+    ("list all triggers", "general", "community"),
+    ("what are all the triggers in the org", "general", "community"),
+    ("list every method", "general", "community"),
+    ("list all fields", "general", "community"),
+    # architecture -> global
+    ("what is the technical architecture", "explain", "global"),
+    ("explain the architecture of the system", "explain", "global"),
+    ("how are components organized", "explain", "global"),
+    ("what design patterns are used", "explain", "global"),
+    ("describe the overall system design", "explain", "global"),
+    ("how is the code structured across modules", "explain", "global"),
+    ("what is the high level structure of the codebase", "explain", "global"),
+    # specific code -> local
+    ("how does the login function work", "explain", "local"),
+    ("how does SlackNotifier work", "explain", "local"),
+    ("what does authenticate do", "explain", "local"),
+    ("give me the code for AccountSlackNotifyJob", "explain", "local"),
+    ("show me the full code of AccountSummaryService", "explain", "local"),
+    ("show me the implementation of the trigger", "explain", "local"),
+    ("what objects does AccountSummaryService use", "explain", "local"),
+    ("explain the AccountPhoneUpdate trigger", "explain", "local"),
+    ("what does this method return", "explain", "local"),
+    ("walk me through the execute method", "explain", "local"),
+    # refactor
+    ("refactor SlackNotifier to use named credentials", "refactor", "local"),
+    ("how can i improve the structure of AccountSummaryService", "refactor", "local"),
+    ("clean up the trigger handler code", "refactor", "local"),
+    ("rewrite this class to be bulkified", "refactor", "local"),
+    ("suggest a better design for the notification job", "refactor", "local"),
+    # debug
+    ("why is the trigger failing", "debug", "local"),
+    ("fix the null pointer exception in SlackNotifier", "debug", "local"),
+    ("the job throws an error when phone is empty", "debug", "local"),
+    ("debug the callout failure", "debug", "local"),
+    ("why does the test class fail", "debug", "local"),
+    ("getting limit exception in the queueable", "debug", "local"),
+    # impact analysis
+    ("what breaks if i delete the Account_Feedback__c object", "impact_analysis", "local"),
+    ("what is the impact of changing the phone field", "impact_analysis", "local"),
+    ("which classes are affected if i change SlackNotifier", "impact_analysis", "local"),
+    ("what depends on AccountSummaryService", "impact_analysis", "local"),
+    ("impact of removing the trigger", "impact_analysis", "local"),
+    # destructive "all" requests are about impact, not listing
+    ("delete all test classes", "impact_analysis", "local"),
+    ("remove all unused fields", "impact_analysis", "local"),
+    ("drop all custom objects", "impact_analysis", "local"),
+    ("deactivate every trigger", "impact_analysis", "local"),
+    ("can i delete all of these lwc components", "impact_analysis", "local"),
+    ("remove every apex class that is not used", "impact_analysis", "local"),
+    ("get rid of all the old triggers", "impact_analysis", "local"),
+    # general
+    ("hello", "general", "local"),
+    ("thanks", "general", "local"),
+    ("can you help me", "general", "local"),
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+def _features(text):
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesClassifier:
+    """
+    Tiny multinomial Naive Bayes over unigrams + bigrams.
+    Small enough to train at import time from LABELLED_EXAMPLES.
+    """
+
+    def __init__(self, alpha=0.5):
+        self.alpha = alpha
+        self.label_counts = Counter()
+        self.feature_counts = defaultdict(Counter)
+        self.label_totals = Counter()
+        self.vocab = set()
+
+    def fit(self, texts, labels):
+        for text, label in zip(texts, labels):
+            feats = _features(text)
+            self.label_counts[label] += 1
+            self.feature_counts[label].update(feats)
+            self.label_totals[label] += len(feats)
+            self.vocab.update(feats)
+        return self
+
+    def predict_proba(self, text):
+        feats = [f for f in _features(text) if f in self.vocab]
+        if not feats:
+            return {}
+        n_docs = sum(self.label_counts.values())
+        v = len(self.vocab)
+        log_probs = {}
+        for label, count in self.label_counts.items():
+            lp = math.log(count / n_docs)
+            denom = self.label_totals[label] + self.alpha * v
+            for f in feats:
+                lp += math.log((self.feature_counts[label][f] + self.alpha) / denom)
+            log_probs[label] = lp
+        top = max(log_probs.values())
+        exp = {label: math.exp(lp - top) for label, lp in log_probs.items()}
+        total = sum(exp.values())
+        return {label: p / total for label, p in exp.items()}
+
+    def predict(self, text):
+        """Returns (label, confidence), or (None, 0.0) if no known features."""
+        proba = self.predict_proba(text)
+        if not proba:
+            return None, 0.0
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+
+def _train_heads():
+    texts = [ex[0] for ex in LABELLED_EXAMPLES]
+    return {
+        "intent": NaiveBayesClassifier().fit(texts, [ex[1] for ex in LABELLED_EXAMPLES]),
+        "search_method": NaiveBayesClassifier().fit(texts, [ex[2] for ex in LABELLED_EXAMPLES]),
+    }
+
+
+_HEADS = _train_heads()
+
+
+def route_locally(query, threshold=LOCAL_CONFIDENCE_THRESHOLD):
+    """
+    Offline fast path. Returns a route dict if every head is confident, else None.
+    """
+    # Unseen words are ignored by the heads, so an unknown leading verb ("erase all
+    # classes") would leave only the words that look like a listing request
+    words = _TOKEN_RE.findall(query.lower())
+    if words and words[0] not in _HEADS["intent"].vocab:
+        return None
+
+    route = {}
+    confidences = {}
+    for head, clf in _HEADS.items():
+        label, confidence = clf.predict(query)
+        if label is None or confidence < threshold:
+            return None
+        route[head] = label
+        confidences[head] = round(confidence, 3)
+
+    route["confidence"] = confidences
+    route["source"] = "local"
+    return route
+
+
+ROUTER_SYSTEM_PROMPT = """You are the query router for a Salesforce code analysis system.
+Classify the user's query along two axes in a single answer.
+
+**intent** (what the user wants to do):
+- explain: Explaining concepts, architecture, or code flow.
+- refactor: improving or changing code structure.
+- debug: fixing errors or issues.
+- impact_analysis: assessing the effect of changes.
+- general: generic questions.
+
+**search_method** (best GraphRAG search method):
+- local: specific functions, classes, code snippets, "full code" or "implementation" requests.
+- community: project features, capabilities, "what is the project about".
+- global: technical architecture, system-wide design, how components are organized.
+
+Respond with JSON only:
+{{"intent": "...", "search_method": "..."}}
+"""
+
+
+def _validate_route(raw):
+    route = dict(DEFAULT_ROUTE)
+    if raw.get("intent") in INTENTS:
+        route["intent"] = raw["intent"]
+    if raw.get("search_method") in SEARCH_METHODS:
+        route["search_method"] = raw["search_method"]
+    return route
+
+
+_router_cache = PersistentLRUCache(
+    max_entries=ROUTER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ROUTER_CACHE_TTL_SECONDS,
+    path=os.path.join(CACHE_DIR, "router_cache.json"),
+)
+
+
+def get_router_cache():
+    """Returns the shared cache of LLM routing decisions (see stats() for hit rate)."""
+    return _router_cache
+
+
+def _router_cache_key(query):
+    return make_key(normalize_query(query), prompt_hash(ROUTER_SYSTEM_PROMPT), ROUTER_LLM_MODEL)
+
+
+def _cached_route(key):
+    cached = _router_cache.get(key)
+    if cached is None:
+        return None
+    route = dict(cached)
+    route["source"] = "cache"
+    return route
+
+
+def _router_chain():
+    from langchain_openai import ChatOpenAI
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = ChatOpenAI(model=ROUTER_LLM_MODEL, temperature=0, model_kwargs={"response_format": {"type": "json_object"}})
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", ROUTER_SYSTEM_PROMPT),
+        ("user", "Query: {query}"),
+    ])
+    return prompt | llm
+
+
+def _store_llm_route(key, content):
+    route = _validate_route(json.loads(content.strip()))
+    _router_cache.set(key, route)
+    route["source"] = "llm"
+    return route
+
+
+def route_with_llm(query):
+    """
+    One structured LLM call that returns all routing decisions together.
+    Answers are memoized on (normalized query, prompt hash, model name).
+    """
+    key = _router_cache_key(query)
+    route = _cached_route(key)
+    if route is not None:
+        return route
+    result = _router_chain().invoke({"query": query})
+    return _store_llm_route(key, result.content)
+
+
+async def aroute_with_llm(query):
+    """Async variant of route_with_llm (non-blocking LLM client)."""
+    key = _router_cache_key(query)
+    route = _cached_route(key)
+    if route is not None:
+        return route
+    result = await _router_chain().ainvoke({"query": query})
+    return _store_llm_route(key, result.content)
+
+
+def _default_route(error):
+    print(f"⚠️  Query Routing Failed: {error}")
+    route = dict(DEFAULT_ROUTE)
+    route["source"] = "default"
+    return route
+
+
+def route_query(query):
+    """
+    Returns the intent and GraphRAG search method for a query.
+    Tries the local classifier first and falls back to a single LLM call;
+    on any LLM failure returns DEFAULT_ROUTE.
+    """
+    route = route_locally(query)
+    if route is not None:
+        return route
+
+    try:
+        return route_with_llm(query)
+    except Exception as e:
+        return _default_route(e)
+
+
+async def aroute_query(query):
+    """Async variant of route_query."""
+    route = route_locally(query)
+    if route is not None:
+        return route
+
+    try:
+        return await aroute_with_llm(query)
+    except Exception as e:
+        return _default_route(e)
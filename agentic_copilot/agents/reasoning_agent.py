@@ -1,11 +1,17 @@
 from agentic_copilot.schemas.state import GlobalState
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from agentic_copilot.agents.context_budget import ContextBudgeter
 import os
+import asyncio
 
-def final_reasoning(state: GlobalState):
+FINAL_REASONING_MODEL = "gpt-4o"
+
+def _build_reasoning_chain(state: GlobalState):
     """
-    Universal query handler using comprehensive LLM prompt - NO hardcoding.
+    Builds the universal prompt chain and its inputs from the gathered context.
+    Shared by the sync and async final reasoning nodes.
     """
     intent = state.get("intent", "general")
     query = state.get("user_query", "")
@@ -25,26 +31,24 @@ def final_reasoning(state: GlobalState):
     print(f"   - Tool Results: {len(tool_data)} items")
     print(f"   - Risk Signals: {len(risks)} items")
     
-    # Build context for LLM
-    context_parts = []
-    
-    if code_data:
-        context_parts.append("**Code Analysis Data:**\n" + "\n".join([str(c) for c in code_data]))
-    
-    if rag_data:
-        context_parts.append("**Documentation:**\n" + "\n".join([str(d) for d in rag_data]))
-    
-    if tool_data:
-        context_parts.append("**Tool Results:**\n" + "\n".join([str(t) for t in tool_data]))
-    
-    if risks:
-        context_parts.append("**Risk Signals:**\n" + "\n".join([str(r) for r in risks]))
+    # Build context for LLM: deduplicated, relevance-ranked and packed into the model's token budget
+    budgeter = ContextBudgeter(model=FINAL_REASONING_MODEL)
+    all_context, budget_report = budgeter.assemble(query, [
+        ("Code Analysis Data", code_data),
+        ("Documentation", rag_data),
+        ("Tool Results", tool_data),
+        ("Risk Signals", risks),
+    ])
     
-    all_context = "\n\n".join(context_parts) if context_parts else "No data available."
+    print(f"🧮 Context Budget: {budget_report['used_tokens']}/{budget_report['budget']} tokens used, "
+          f"{budget_report['dropped_tokens']} dropped "
+          f"({budget_report['blocks_kept']}/{budget_report['blocks_total']} blocks kept, "
+          f"{budget_report['duplicates_removed']} duplicates, {budget_report['blocks_truncated']} truncated, "
+          f"{budget_report['blocks_summarized']} summarized)")
     
     print(f"🤖 Processing with GPT-4 using universal prompt...")
     
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = ChatOpenAI(model=FINAL_REASONING_MODEL, temperature=0)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are an elite Salesforce Solutions Architect with 10+ years of experience analyzing enterprise Salesforce implementations.
@@ -150,14 +154,31 @@ Analyze the data with your Salesforce expertise. Filter out configuration noise
     ])
     
     chain = prompt | llm
-    result = chain.invoke({
+    return chain, {
         "query": query,
         "context": all_context
-    })
-    
+    }, budget_report
+
+def _final_answer(result, budget_report):
     print(f"✅ Response Generated: {len(result.content)} characters")
     print("="*80 + "\n")
     
-    return {"final_answer": result.content}
+    return {"final_answer": result.content, "context_budget": budget_report}
+
+def final_reasoning(state: GlobalState):
+    """
+    Universal query handler using comprehensive LLM prompt - NO hardcoding.
+    """
+    chain, inputs, budget_report = _build_reasoning_chain(state)
+    return _final_answer(chain.invoke(inputs), budget_report)
+
+async def afinal_reasoning(state: GlobalState):
+    """Async variant of final_reasoning (non-blocking LLM client)."""
+    # Token counting and the first tiktoken load (which may download BPE files) stay off the event loop
+    chain, inputs, budget_report = await asyncio.to_thread(_build_reasoning_chain, state)
+    return _final_answer(await chain.ainvoke(inputs), budget_report)
+
+# Node usable from both graph.invoke() and graph.ainvoke()
+final_reasoning_node = RunnableLambda(final_reasoning, afunc=afinal_reasoning, name="final_reasoning")
 
 
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import glob
+import threading
+from agentic_copilot.cache.lru_cache import PersistentLRUCache, CACHE_DIR, normalize_query, make_key
+
+ANSWER_CACHE_BACKEND = os.environ.get("ANSWER_CACHE_BACKEND", "memory")  # memory | disk | redis | local_shared | none
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryBackend:
+    """Per-process LRU with TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self._cache = PersistentLRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class DiskBackend:
+    """One JSON file per answer, so large answers never require rewriting the whole cache."""
+
+    name = "disk"
+
+    def __init__(self, directory=os.path.join(CACHE_DIR, "answers"), ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("expires_at") and entry["expires_at"] <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.tmp.{threading.get_ident()}"
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": expires_at, "value": value}, f)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(glob.glob(os.path.join(self.directory, "*.json"))),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class LocalSharedStore:
+    """
+    In-process stand-in for the subset of the Redis client API used by
+    SharedStoreBackend (get / set with ex / delete / scan_iter), for local runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for k in keys if self._data.pop(k, None) is not None)
+
+    def scan_iter(self, match=None):
+        prefix = match[:-1] if match and match.endswith("*") else match
+        with self._lock:
+            keys = list(self._data)
+        return [k for k in keys if prefix is None or k.startswith(prefix)]
+
+
+class SharedStoreBackend:
+    """Shared answer cache for multiple workers (Redis, or any client with the same API)."""
+
+    name = "shared"
+
+    def __init__(self, client, prefix="copilot:answer:", ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl_seconds or None)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+def create_backend(kind=ANSWER_CACHE_BACKEND):
+    """Builds the configured backend; returns None when caching is disabled."""
+    if kind == "none":
+        return None
+    if kind == "disk":
+        return DiskBackend()
+    if kind == "local_shared":
+        return SharedStoreBackend(LocalSharedStore())
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            print("⚠️  ANSWER_CACHE_BACKEND=redis but the 'redis' package is not installed; using in-memory cache")
+            return MemoryBackend()
+        return SharedStoreBackend(redis.Redis.from_url(REDIS_URL))
+    return MemoryBackend()
+
+
+class AnswerCache:
+    """
+    Final-answer cache for /api/query keyed on (normalized query, index version).
+    A new index produces a new version, so stale answers are never served.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _key(self, query, index_version):
+        return make_key("answer", normalize_query(query), index_version)
+
+    def get(self, query, index_version):
+        if self.backend is None or not index_version:
+            return None
+        try:
+            return self.backend.get(self._key(query, index_version))
+        except Exception as e:
+            print(f"⚠️  Answer cache read failed: {e}")
+            return None
+
+    def set(self, query, index_version, value):
+        if self.backend is None or not index_version:
+            return
+        try:
+            self.backend.set(self._key(query, index_version), value)
+        except Exception as e:
+            print(f"⚠️  Answer cache write failed: {e}")
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        if self.backend is None:
+            return {"backend": "none"}
+        return {"backend": self.backend.name, **self.backend.stats()}
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Returns the shared AnswerCache for the configured backend."""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache(create_backend())
+        return _answer_cache
@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.environ.get("COPILOT_CACHE_DIR", ".copilot_cache")
+# Persistent caches write changes in batches, at most this often (and once at exit)
+CACHE_FLUSH_SECONDS = float(os.environ.get("CACHE_FLUSH_SECONDS", "5"))
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return _WS_RE.sub(" ", (query or "").lower()).strip().rstrip("?!. ")
+
+
+def make_key(*parts):
+    """Stable hex key for any JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def prompt_hash(*prompt_parts):
+    """Short hash of prompt text, so editing a prompt invalidates its cached answers."""
+    return hashlib.sha256("\x00".join(prompt_parts).encode("utf-8")).hexdigest()[:16]
+
+
+class PersistentLRUCache:
+    """
+    Thread-safe key/value cache with TTL expiry, size-bounded LRU eviction and
+    optional JSON persistence (values must be JSON-serializable).
+
+    Persistence is batched: writes only mark the cache dirty, and a timer
+    flushes a snapshot to disk `flush_seconds` later (also at interpreter exit,
+    or on an explicit flush()). Hit/miss/eviction counters are available
+    through stats().
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=7 * 24 * 3600, path=None, flush_seconds=CACHE_FLUSH_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # Serializes file writes, which happen outside self._lock
+        self._flush_lock = threading.Lock()
+        # key -> (expires_at, value), most recently used last
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._flush_timer = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._load()
+            atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (expires_at, value) in data.items():
+            if expires_at is None or expires_at > now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _mark_dirty(self):
+        """Schedules a flush; call with self._lock held."""
+        if not self.path:
+            return
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_seconds, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Writes pending changes to disk (atomic replace). No-op when nothing changed."""
+        if not self.path:
+            return
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return
+                snapshot = dict(self._entries)
+                self._dirty = False
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"⚠️  Cache persist failed ({self.path}): {e}")
+                with self._lock:
+                    self._mark_dirty()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._mark_dirty()
+
+    def delete(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._mark_dirty()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._mark_dirty()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,60 +1,48 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from agentic_copilot.schemas.state import GlobalState
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from agentic_copilot.agents.query_router import route_query, aroute_query
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-# Initialize LLM lazily
-def get_llm():
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        print("WARNING: OPENAI_API_KEY not found in environment.")
-    return ChatOpenAI(model="gpt-4o", temperature=0, api_key=api_key)
-
-def analyze_intent(state: GlobalState):
-    query = state["user_query"]
-    llm = get_llm()
-    
+def _print_header(query):
     print("\n" + "="*80)
     print("🧠 INTENT AGENT - Analyzing Query")
     print("="*80)
     print(f"📝 User Query: '{query}'")
-    
-    system_prompt = """You are an intent classifier for an engineering system.
-    Classify the query into one of these categories:
-    - explain: Explaining concepts, architecture, or code flow.
-    - refactor: improving or changing code structure.
-    - debug: fixing errors or issues.
-    - impact_analysis: assessing the effect of changes.
-    - general: generic questions.
-    
-    Return ONLY the category name.
-    """
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("user", "{query}")
-    ])
-    
-    try:
-        chain = prompt | llm
-        result = chain.invoke({"query": query})
-        intent = result.content.strip().lower()
-        print(f"✅ Intent Classified: '{intent}'")
-    except Exception as e:
-        print(f"⚠️  Intent Classification Failed (likely API Quota/Error): {e}")
-        print(f"🔄 Defaulting to 'general' intent")
-        intent = "general"
+
+def _intent_update(route):
+    intent = route["intent"]
+
+    print(f"✅ Intent Classified: '{intent}' (via {route.get('source', 'llm')} router)")
+    print(f"   Search Method: '{route['search_method']}'")
     print("="*80 + "\n")
-    
-    return {"intent": intent}
+
+    return {
+        "intent": intent,
+        "search_method": route["search_method"],
+    }
+
+def analyze_intent(state: GlobalState):
+    """
+    Routes the query once: intent and GraphRAG search method are
+    decided together (local classifier first, one LLM call as fallback).
+    """
+    query = state["user_query"]
+    _print_header(query)
+    return _intent_update(route_query(query))
+
+async def aanalyze_intent(state: GlobalState):
+    """Async variant of analyze_intent, used when the graph runs via ainvoke."""
+    query = state["user_query"]
+    _print_header(query)
+    return _intent_update(await aroute_query(query))
 
 def create_intent_subgraph():
     workflow = StateGraph(GlobalState)
-    workflow.add_node("analyze_intent", analyze_intent)
+    workflow.add_node("analyze_intent", RunnableLambda(analyze_intent, afunc=aanalyze_intent, name="analyze_intent"))
     workflow.set_entry_point("analyze_intent")
     workflow.add_edge("analyze_intent", END)
     return workflow.compile()
@@ -1,4 +1,6 @@
 from langgraph.graph import StateGraph, END, START
+import threading
+import time
 from agentic_copilot.schemas.state import GlobalState
 
 # Import subgraphs
@@ -7,7 +9,7 @@ from agentic_copilot.graphs.rag_subgraph import create_rag_subgraph
 from agentic_copilot.graphs.graphrag_subgraph import create_graphrag_subgraph
 from agentic_copilot.graphs.tool_subgraph import create_tool_subgraph
 from agentic_copilot.graphs.risk_subgraph import create_risk_subgraph
-from agentic_copilot.agents.reasoning_agent import final_reasoning
+from agentic_copilot.agents.reasoning_agent import final_reasoning_node
 
 def create_main_graph():
     workflow = StateGraph(GlobalState)
@@ -23,7 +25,7 @@ def create_main_graph():
     # workflow.add_node("risk_agent", create_risk_subgraph())
     
     # Reducer/Final node
-    workflow.add_node("final_reasoner", final_reasoning)
+    workflow.add_node("final_reasoner", final_reasoning_node)
     
     # 2. Define Edges
     # Start -> Intent
@@ -45,3 +47,31 @@ def create_main_graph():
     workflow.add_edge("final_reasoner", END)
     
     return workflow.compile()
+
+
+# Compiled graph shared by all requests. A compiled graph holds no per-run state
+# (no checkpointer), so concurrent invoke()/ainvoke() calls each get their own state.
+_main_graph = None
+_main_graph_lock = threading.Lock()
+_compile_stats = {"compile_seconds": None, "compiled_at": None, "compile_count": 0}
+
+def get_main_graph():
+    """
+    Returns the process-wide compiled main graph, compiling it on first use.
+    """
+    global _main_graph
+    if _main_graph is not None:
+        return _main_graph
+    with _main_graph_lock:
+        if _main_graph is None:
+            start = time.perf_counter()
+            _main_graph = create_main_graph()
+            elapsed = time.perf_counter() - start
+            _compile_stats["compile_seconds"] = round(elapsed, 4)
+            _compile_stats["compiled_at"] = time.time()
+            _compile_stats["compile_count"] += 1
+            print(f"✅ Main graph compiled in {elapsed * 1000:.1f} ms")
+    return _main_graph
+
+def get_graph_compile_stats():
+    return dict(_compile_stats)
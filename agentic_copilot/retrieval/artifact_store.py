@@ -0,0 +1,199 @@
+import os
+import threading
+import hashlib
+import pandas as pd
+
+# GraphRAG parquet tables we know how to serve from memory
+ARTIFACT_TABLES = (
+    "entities",
+    "relationships",
+    "text_units",
+    "communities",
+    "community_reports",
+    "documents",
+    "covariates",
+)
+
+
+def _file_signature(path):
+    """
+    Cheap change detector for a single artifact file.
+    Returns (mtime_ns, size) or None if the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ArtifactStore:
+    """
+    Process-wide, version-aware cache of the GraphRAG parquet outputs.
+
+    Each table is decoded once and kept in memory until the file on disk changes
+    (detected via mtime/size). Callers must treat returned DataFrames as read-only,
+    since the same object is shared across requests.
+
+    Loads and builds run under a per-key lock, so concurrent callers of the same
+    table or index wait for one build while other keys stay available; the
+    store-wide lock only guards the cache dictionaries.
+
+    Invalidation never drops a lock that a builder may hold; it bumps a
+    generation number instead, and a load or build that started before the
+    invalidation returns its result without caching it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # ("table" | "derived", abs_output_dir, name) -> Lock held while loading / building it
+        self._key_locks = {}
+        # (abs_output_dir, table_name) -> (signature, DataFrame)
+        self._tables = {}
+        # (abs_output_dir, derived_name) -> (signature, object)
+        self._derived = {}
+        # Bumped by every invalidation; results of older loads / builds are not cached
+        self._generation = 0
+        self.loads = 0
+        self.hits = 0
+
+    def _table_path(self, output_dir, name):
+        return os.path.join(output_dir, f"{name}.parquet")
+
+    def has_table(self, output_dir, name):
+        return os.path.exists(self._table_path(output_dir, name))
+
+    def get_table(self, output_dir, name):
+        """
+        Returns the DataFrame for `name` in `output_dir`, or None if it does not exist.
+        Reloads only when the underlying file has changed since the last load.
+        """
+        output_dir = os.path.abspath(str(output_dir))
+        path = self._table_path(output_dir, name)
+        signature = _file_signature(path)
+        key = (output_dir, name)
+
+        if signature is None:
+            with self._lock:
+                self._tables.pop(key, None)
+            return None
+
+        cached = self._cached(self._tables, key, signature)
+        if cached is not None:
+            return cached[1]
+
+        with self._key_lock("table", key):
+            # Another thread may have loaded it while we waited
+            cached = self._cached(self._tables, key, signature)
+            if cached is not None:
+                return cached[1]
+
+            generation = self._generation
+            print(f"DEBUG: ArtifactStore loading {name}.parquet from {output_dir}")
+            df = pd.read_parquet(path)
+            with self._lock:
+                self.loads += 1
+                if generation == self._generation:
+                    self._tables[key] = (signature, df)
+            return df
+
+    def _key_lock(self, kind, key):
+        with self._lock:
+            return self._key_locks.setdefault((kind,) + key, threading.Lock())
+
+    def _cached(self, cache, key, signature):
+        with self._lock:
+            cached = cache.get(key)
+            if cached is not None and cached[0] == signature:
+                if cache is self._tables:
+                    self.hits += 1
+                return cached
+            return None
+
+    def get_derived(self, output_dir, name, builder, depends_on=("entities",)):
+        """
+        Returns an index structure built from artifact tables, rebuilding it only when
+        one of the tables in `depends_on` changes. `builder(output_dir)` is called
+        on a miss and may return None if the inputs are missing.
+        """
+        output_dir = os.path.abspath(str(output_dir))
+        signature = tuple(_file_signature(self._table_path(output_dir, t)) for t in depends_on)
+        key = (output_dir, name)
+
+        cached = self._cached(self._derived, key, signature)
+        if cached is not None:
+            return cached[1]
+
+        with self._key_lock("derived", key):
+            cached = self._cached(self._derived, key, signature)
+            if cached is not None:
+                return cached[1]
+
+            generation = self._generation
+            print(f"DEBUG: ArtifactStore building {name} for {output_dir}")
+            value = builder(output_dir)
+            with self._lock:
+                if generation == self._generation:
+                    self._derived[key] = (signature, value)
+            return value
+
+    def index_version(self, output_dir):
+        """
+        Short, stable identifier for the current contents of `output_dir`.
+        Changes whenever any known artifact table is added, removed or rewritten.
+        """
+        output_dir = os.path.abspath(str(output_dir))
+        parts = []
+        for name in ARTIFACT_TABLES:
+            sig = _file_signature(self._table_path(output_dir, name))
+            if sig is not None:
+                parts.append(f"{name}:{sig[0]}:{sig[1]}")
+        if not parts:
+            return None
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def invalidate(self, output_dir=None):
+        """
+        Drops cached tables for one output directory, or everything. Per-key locks
+        are kept, so a caller arriving during an in-flight build still waits for it.
+        """
+        with self._lock:
+            self._generation += 1
+            if output_dir is None:
+                self._tables.clear()
+                self._derived.clear()
+                return
+            output_dir = os.path.abspath(str(output_dir))
+            self._drop(lambda d: d == output_dir)
+
+    def retain(self, output_dir):
+        """
+        Drops cached entries of every directory except `output_dir`, e.g. the
+        previous index versions once a new one is current. Locks of directories
+        that no longer exist (pruned versions) are released too.
+        """
+        output_dir = os.path.abspath(str(output_dir))
+        with self._lock:
+            self._generation += 1
+            self._drop(lambda d: d != output_dir)
+            missing = {k[1] for k in self._key_locks if k[1] != output_dir and not os.path.isdir(k[1])}
+            for key in [k for k in self._key_locks if k[1] in missing]:
+                del self._key_locks[key]
+
+    def _drop(self, matches):
+        for cache in (self._tables, self._derived):
+            for key in [k for k in cache if matches(k[0])]:
+                del cache[key]
+
+    def stats(self):
+        with self._lock:
+            return {"tables": len(self._tables), "derived": len(self._derived), "locks": len(self._key_locks),
+                    "loads": self.loads, "hits": self.hits}
+
+
+_store = ArtifactStore()
+
+
+def get_artifact_store():
+    """Returns the shared process-wide ArtifactStore."""
+    return _store
@@ -0,0 +1,159 @@
+import os
+import bisect
+import numpy as np
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+from agentic_copilot.retrieval.tokenize import tokenize, token_counts, to_text
+from agentic_copilot.retrieval.text_unit_index import as_id_list
+
+# Ranking defaults for direct parquet retrieval (overridable per call)
+BM25_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "25"))
+BM25_MIN_SCORE = float(os.environ.get("RETRIEVAL_MIN_SCORE", "0.5"))
+# Drop results scoring below this fraction of the best hit
+BM25_MIN_RELATIVE_SCORE = float(os.environ.get("RETRIEVAL_MIN_RELATIVE_SCORE", "0.15"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights for entity scoring; text-unit matches are propagated to the
+# entities that reference them
+ENTITY_FIELD_WEIGHTS = {"title": 3.0, "description": 1.0}
+TEXT_UNIT_WEIGHT = 0.5
+
+# Query terms missing from the vocabulary are expanded to at most this many prefix matches
+MAX_PREFIX_EXPANSIONS = 20
+
+
+class BM25Field:
+    """Okapi BM25 postings (row positions + term frequencies) for one text column."""
+
+    def __init__(self, values):
+        postings = {}
+        lengths = np.zeros(len(values), dtype=np.float64)
+        for row, value in enumerate(values):
+            counts = token_counts(to_text(value))
+            lengths[row] = sum(counts.values())
+            for token, tf in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(row)
+                postings[token][1].append(tf)
+
+        self.size = len(values)
+        avg_length = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        # Per-row length normalisation, precomputed once
+        self.norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+        self.postings = {
+            token: (np.asarray(rows, dtype=np.int64), np.asarray(tfs, dtype=np.float64))
+            for token, (rows, tfs) in postings.items()
+        }
+        self.vocab = sorted(self.postings)
+
+    def expand(self, term):
+        """The term itself if indexed, else indexed tokens it prefixes (for partial names)."""
+        if term in self.postings:
+            return [term]
+        lo = bisect.bisect_left(self.vocab, term)
+        matches = []
+        for token in self.vocab[lo:lo + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches.append(token)
+        return matches
+
+    def score(self, terms):
+        """Dense BM25 scores (one per row) for the query terms."""
+        scores = np.zeros(self.size, dtype=np.float64)
+        for term in terms:
+            for token in self.expand(term):
+                rows, tfs = self.postings[token]
+                idf = np.log(1 + (self.size - rows.size + 0.5) / (rows.size + 0.5))
+                scores[rows] += idf * tfs * (BM25_K1 + 1) / (tfs + self.norm[rows])
+        return scores
+
+
+class BM25Retriever:
+    """
+    Ranked entity retrieval over entity titles, descriptions and the text units
+    each entity was extracted from. Built once per index version.
+    """
+
+    def __init__(self, df_entities, df_text=None):
+        self.size = len(df_entities)
+        self.fields = {}
+        for field in ENTITY_FIELD_WEIGHTS:
+            if field in df_entities.columns:
+                self.fields[field] = BM25Field(df_entities[field].tolist())
+
+        self.text_units = None
+        self.unit_entity_rows = None
+        if df_text is not None and "text" in df_text.columns and "text_unit_ids" in df_entities.columns:
+            self.text_units = BM25Field(df_text["text"].tolist())
+            # CSR mapping text-unit row -> entity rows that reference it
+            unit_offsets = {tid: i for i, tid in enumerate(df_text["id"].tolist())}
+            pairs = [
+                (unit_offsets[tid], entity_row)
+                for entity_row, ids in enumerate(df_entities["text_unit_ids"].tolist())
+                for tid in as_id_list(ids)
+                if tid in unit_offsets
+            ]
+            pairs.sort()
+            units = np.asarray([u for u, _ in pairs], dtype=np.int64)
+            self.unit_entity_rows = np.asarray([e for _, e in pairs], dtype=np.int64)
+            self.unit_entity_ptr = np.searchsorted(units, np.arange(len(df_text) + 1))
+
+    def query_terms(self, keywords):
+        terms = set()
+        for kw in keywords:
+            terms |= tokenize(kw)
+        return sorted(terms)
+
+    def score_entities(self, keywords):
+        terms = self.query_terms(keywords)
+        scores = np.zeros(self.size, dtype=np.float64)
+        for field, index in self.fields.items():
+            scores += ENTITY_FIELD_WEIGHTS[field] * index.score(terms)
+
+        if self.text_units is not None and self.unit_entity_rows.size:
+            unit_scores = self.text_units.score(terms)
+            # Units shared by many entities say less about each of them
+            refs_per_unit = np.diff(self.unit_entity_ptr)
+            unit_contrib = TEXT_UNIT_WEIGHT * unit_scores / np.sqrt(np.maximum(refs_per_unit, 1))
+            # An entity's best supporting text unit counts, not the number of them
+            best_unit = np.zeros(self.size, dtype=np.float64)
+            np.maximum.at(best_unit, self.unit_entity_rows, np.repeat(unit_contrib, refs_per_unit))
+            scores += best_unit
+        return scores
+
+    def search(self, keywords, k=BM25_TOP_K, min_score=BM25_MIN_SCORE, min_relative_score=BM25_MIN_RELATIVE_SCORE):
+        """
+        Returns [(row, score), ...] for the top-k entities (all matches if k is None), best first.
+        Results below min_score, or below min_relative_score * best score, are dropped.
+        """
+        if not self.size:
+            return []
+        scores = self.score_entities(keywords)
+        candidates = np.flatnonzero(scores >= max(min_score, 1e-9))
+        if not candidates.size:
+            return []
+        if k and candidates.size > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        # Stable tie-break on row position keeps results deterministic
+        order = np.lexsort((candidates, -scores[candidates]))
+        candidates = candidates[order]
+        cutoff = scores[candidates[0]] * min_relative_score
+        return [(int(row), float(scores[row])) for row in candidates if scores[row] >= cutoff]
+
+
+def _build_bm25_retriever(output_dir):
+    store = get_artifact_store()
+    df_entities = store.get_table(output_dir, "entities")
+    if df_entities is None:
+        return None
+    return BM25Retriever(df_entities, store.get_table(output_dir, "text_units"))
+
+
+def get_bm25_retriever(output_dir):
+    """Returns the cached BM25Retriever for the current entities/text_units tables, or None."""
+    return get_artifact_store().get_derived(
+        output_dir, "bm25_retriever", _build_bm25_retriever, depends_on=("entities", "text_units")
+    )
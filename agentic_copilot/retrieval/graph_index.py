@@ -0,0 +1,159 @@
+import numpy as np
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+from agentic_copilot.retrieval.tokenize import to_text
+
+
+class GraphIndex:
+    """
+    Compressed sparse row (CSR) adjacency over relationships.parquet.
+
+    Node i is entity row i (relationships refer to entities by title); titles that
+    only appear in relationships get extra nodes past the last entity row. Edges are
+    stored in both directions; the neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]], already sorted by descending weight.
+    edge_rows maps each stored edge back to its relationships.parquet row, and
+    rel_source / rel_target keep each row's original direction.
+    """
+
+    def __init__(self, df_entities, df_rels):
+        self.titles = [to_text(t) for t in df_entities["title"].tolist()]
+        self.node_ids = {}
+        for i, title in enumerate(self.titles):
+            self.node_ids.setdefault(title.lower(), i)
+
+        sources, targets, weights, rows = [], [], [], []
+        rel_source, rel_target = [], []
+        self.descriptions = []
+        if df_rels is not None and len(df_rels):
+            rel_weights = df_rels["weight"].fillna(1.0).tolist() if "weight" in df_rels.columns else [1.0] * len(df_rels)
+            rel_descriptions = df_rels["description"].tolist() if "description" in df_rels.columns else [""] * len(df_rels)
+            self.descriptions = [to_text(d) for d in rel_descriptions]
+            for row, (source, target, weight) in enumerate(zip(df_rels["source"].tolist(), df_rels["target"].tolist(), rel_weights)):
+                u, v = self._node_for(to_text(source)), self._node_for(to_text(target))
+                rel_source.append(u)
+                rel_target.append(v)
+                if u == v:
+                    continue
+                sources.extend((u, v))
+                targets.extend((v, u))
+                weights.extend((weight, weight))
+                rows.extend((row, row))
+
+        self.size = len(self.titles)
+        self.rel_source = np.asarray(rel_source, dtype=np.int64)
+        self.rel_target = np.asarray(rel_target, dtype=np.int64)
+        src = np.asarray(sources, dtype=np.int64)
+        dst = np.asarray(targets, dtype=np.int64)
+        wgt = np.asarray(weights, dtype=np.float64)
+        # Group by source node, heaviest edge first within each group
+        order = np.lexsort((-wgt, src))
+        self.indices = dst[order]
+        self.weights = wgt[order]
+        self.edge_rows = np.asarray(rows, dtype=np.int64)[order]
+        self.indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.size), out=self.indptr[1:])
+
+    def _node_for(self, title):
+        # Relationships can mention entities missing from entities.parquet; give them a node
+        node = self.node_ids.get(title.lower())
+        if node is None:
+            node = len(self.titles)
+            self.titles.append(title)
+            self.node_ids[title.lower()] = node
+        return node
+
+    def node(self, title):
+        """Node id for an entity title (case-insensitive), or None."""
+        return self.node_ids.get(to_text(title).lower())
+
+    def degree(self, node):
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    def neighbors(self, node, limit=None):
+        """(neighbour node ids, weights, relationship rows), heaviest first."""
+        start, end = self.indptr[node], self.indptr[node + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.indices[start:end], self.weights[start:end], self.edge_rows[start:end]
+
+    def expand(self, seeds, hops=2, max_nodes=50, per_node_limit=10):
+        """
+        k-hop neighbourhood of the seed nodes: {node: hop distance}.
+        Each node contributes at most per_node_limit of its heaviest neighbours,
+        and expansion stops once max_nodes have been reached.
+        """
+        distances = {int(s): 0 for s in seeds}
+        frontier = list(distances)
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for node in frontier:
+                for neighbor in self.neighbors(node, per_node_limit)[0].tolist():
+                    if neighbor in distances:
+                        continue
+                    if len(distances) >= max_nodes:
+                        return distances
+                    distances[neighbor] = hop
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+            if not frontier:
+                break
+        return distances
+
+    def shortest_path(self, source, target, max_hops=6):
+        """
+        Fewest-hop path from source to target as a list of nodes (None if farther
+        than max_hops). Frontiers are expanded with array operations over the CSR.
+        """
+        if source == target:
+            return [source]
+        parent = np.full(self.size, -1, dtype=np.int64)
+        parent[source] = source
+        frontier = np.asarray([source], dtype=np.int64)
+        for _ in range(max_hops):
+            starts, ends = self.indptr[frontier], self.indptr[frontier + 1]
+            counts = ends - starts
+            if not counts.sum():
+                return None
+            # Flatten all frontier neighbour slices in one go
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            neighbors = self.indices[offsets]
+            owners = np.repeat(frontier, counts)
+            unseen = parent[neighbors] == -1
+            neighbors, owners = neighbors[unseen], owners[unseen]
+            # First (heaviest) edge wins when several frontier nodes reach the same neighbour
+            neighbors, first = np.unique(neighbors, return_index=True)
+            parent[neighbors] = owners[first]
+            if parent[target] != -1:
+                path = [target]
+                while path[-1] != source:
+                    path.append(int(parent[path[-1]]))
+                return path[::-1]
+            frontier = neighbors
+            if not frontier.size:
+                return None
+        return None
+
+    def edge(self, u, v):
+        """(weight, description) of the heaviest u-v relationship, or None."""
+        neighbors, weights, rows = self.neighbors(u)
+        hits = np.flatnonzero(neighbors == v)
+        if not hits.size:
+            return None
+        i = hits[0]
+        description = self.descriptions[rows[i]] if self.descriptions else ""
+        return float(weights[i]), description
+
+
+def _build_graph_index(output_dir):
+    store = get_artifact_store()
+    df_entities = store.get_table(output_dir, "entities")
+    if df_entities is None:
+        return None
+    return GraphIndex(df_entities, store.get_table(output_dir, "relationships"))
+
+
+def get_graph_index(output_dir):
+    """Returns the cached GraphIndex for the current entities/relationships tables, or None."""
+    return get_artifact_store().get_derived(
+        output_dir, "graph_index", _build_graph_index, depends_on=("entities", "relationships")
+    )
@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pandas as pd
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+from agentic_copilot.retrieval.graph_index import get_graph_index
+
+# Written next to the GraphRAG artifacts; not part of ARTIFACT_TABLES so writing
+# it does not change the index version it was computed for
+LAYOUT_FILE = "graph_layout.parquet"
+LAYOUT_ITERATIONS = int(os.environ.get("GRAPH_LAYOUT_ITERATIONS", "80"))
+LAYOUT_GRID = 128  # repulsion grid resolution (cells per side)
+LAYOUT_EXTENT = 1000.0  # output coordinates are scaled into [-LAYOUT_EXTENT, LAYOUT_EXTENT]
+LAYOUT_SEED = 42
+
+
+def _repulsion_kernels(grid, cell_size, k):
+    """Fruchterman-Reingold repulsion (k^2 / d, away from the source) sampled on grid offsets."""
+    offsets = (np.arange(2 * grid) - grid) * cell_size
+    dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+    dist2 = dx * dx + dy * dy
+    # Clamp the centre / neighbouring cells so co-located nodes do not explode
+    dist2 = np.maximum(dist2, cell_size * cell_size)
+    scale = k * k / dist2
+    kx, ky = dx * scale, dy * scale
+    # Roll so offset 0 sits at index 0, as the circular convolution expects
+    return np.fft.rfft2(np.fft.ifftshift(kx)), np.fft.rfft2(np.fft.ifftshift(ky))
+
+
+def compute_layout(src, dst, n, iterations=LAYOUT_ITERATIONS, seed=LAYOUT_SEED, grid=LAYOUT_GRID):
+    """
+    Force-directed layout for n nodes and undirected edges (src[i], dst[i]).
+
+    Fruchterman-Reingold with every step vectorized: attraction is summed per
+    node with bincount over the edge arrays, and all-pairs repulsion is
+    approximated on a grid by convolving node density with the repulsion kernel
+    via FFT, so an iteration costs O(nodes + edges + grid^2 log grid) instead of
+    O(nodes^2). Returns an (n, 2) float array.
+    """
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, 2))
+    k = 1.0  # ideal edge length
+    side = np.sqrt(n) * k
+    pos = rng.uniform(-side / 2, side / 2, size=(n, 2))
+    if n == 1:
+        return pos
+
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    temperature = side / 10
+    cooling = (0.01) ** (1 / max(iterations, 1))
+    gravity = 0.05  # keeps disconnected components from drifting apart
+
+    for _ in range(iterations):
+        lo = pos.min(axis=0)
+        span = max(float((pos.max(axis=0) - lo).max()), 1e-9)
+        cell_size = span / (grid - 1)
+        cells = np.clip(((pos - lo) / cell_size).astype(np.int64), 0, grid - 1)
+
+        # Repulsion: density on a zero-padded grid, convolved with the kernel
+        flat = cells[:, 0] * (2 * grid) + cells[:, 1]
+        density = np.bincount(flat, minlength=4 * grid * grid).astype(np.float64).reshape(2 * grid, 2 * grid)
+        kx_hat, ky_hat = _repulsion_kernels(grid, cell_size, k)
+        density_hat = np.fft.rfft2(density)
+        field_x = np.fft.irfft2(density_hat * kx_hat, s=density.shape)
+        field_y = np.fft.irfft2(density_hat * ky_hat, s=density.shape)
+        disp = np.stack([field_x[cells[:, 0], cells[:, 1]], field_y[cells[:, 0], cells[:, 1]]], axis=1)
+
+        # Attraction along edges: d^2 / k toward each other
+        if src.size:
+            delta = pos[dst] - pos[src]
+            dist = np.sqrt((delta * delta).sum(axis=1)) + 1e-9
+            pull = delta * (dist / k)[:, None]
+            for axis in (0, 1):
+                disp[:, axis] += np.bincount(src, weights=pull[:, axis], minlength=n)
+                disp[:, axis] -= np.bincount(dst, weights=pull[:, axis], minlength=n)
+
+        disp -= gravity * pos
+
+        # Move each node at most `temperature`, cooling every iteration
+        length = np.sqrt((disp * disp).sum(axis=1)) + 1e-9
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= cooling
+
+    pos -= pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos * (LAYOUT_EXTENT / extent) if extent else pos
+
+
+def _build_graph_layout(output_dir):
+    store = get_artifact_store()
+    df_entities = store.get_table(output_dir, "entities")
+    if df_entities is None:
+        return None
+    index_version = store.index_version(output_dir)
+    path = os.path.join(output_dir, LAYOUT_FILE)
+
+    # Reuse the layout computed after indexing if it belongs to this index version
+    if os.path.exists(path):
+        try:
+            saved = pd.read_parquet(path)
+            if len(saved) == len(df_entities) and saved["index_version"].iat[0] == index_version:
+                print(f"DEBUG: Loaded graph layout from {path}")
+                return saved[["x", "y"]].to_numpy()
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable graph layout {path}: {e}")
+
+    graph_index = get_graph_index(output_dir)
+    print(f"DEBUG: Computing graph layout for {graph_index.size} nodes, {graph_index.rel_source.size} relationships...")
+    coords = compute_layout(graph_index.rel_source, graph_index.rel_target, graph_index.size)[:len(df_entities)]
+
+    try:
+        tmp_path = f"{path}.tmp"
+        pd.DataFrame({
+            "title": df_entities["title"].astype(str).to_numpy(),
+            "x": coords[:, 0],
+            "y": coords[:, 1],
+            "index_version": index_version,
+        }).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Could not save graph layout to {path}: {e}")
+    return coords
+
+
+def get_graph_layout(output_dir):
+    """(n_entities, 2) array of x/y per entity row for the current index version, or None."""
+    return get_artifact_store().get_derived(
+        output_dir, "graph_layout", _build_graph_layout, depends_on=("entities", "relationships")
+    )
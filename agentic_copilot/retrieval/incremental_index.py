@@ -0,0 +1,393 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from agentic_copilot.retrieval.tokenize import to_text
+from agentic_copilot.retrieval.vector_store import LANCEDB_TABLES, find_lancedb_uri
+
+# Written next to the artifacts of every indexing run: {input file name: sha256}.
+# GraphRAG's text loader titles each document with its file name, so the manifest
+# keys are also the titles in documents.parquet.
+MANIFEST_FILE = "input_manifest.json"
+INCREMENTAL_INDEXING = os.environ.get("INCREMENTAL_INDEXING", "1") != "0"
+# Above this share of added/changed/removed files a full run is cheaper than a merge,
+# and the previous community structure would no longer describe the graph
+INCREMENTAL_MAX_CHANGE_FRACTION = float(os.environ.get("INCREMENTAL_MAX_CHANGE_FRACTION", "0.5"))
+# Merged entity / relationship descriptions are capped (GraphRAG would re-summarize them)
+MERGED_DESCRIPTION_MAX_CHARS = 4000
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(input_dir):
+    """{file name: content sha256} for every file in an input directory."""
+    return {entry.name: hash_file(entry.path) for entry in os.scandir(input_dir) if entry.is_file()}
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+class ManifestDiff:
+    """Files added, changed, removed and unchanged between two manifests."""
+
+    def __init__(self, old, new):
+        self.added = sorted(name for name in new if name not in old)
+        self.changed = sorted(name for name in new if name in old and new[name] != old[name])
+        self.removed = sorted(name for name in old if name not in new)
+        self.unchanged = sorted(name for name in new if old.get(name) == new[name])
+
+    @property
+    def to_index(self):
+        """Files whose content must be extracted."""
+        return self.added + self.changed
+
+    @property
+    def stale(self):
+        """Document titles whose previous extraction must be dropped."""
+        return self.changed + self.removed
+
+    def change_fraction(self):
+        total = len(self.added) + len(self.changed) + len(self.removed) + len(self.unchanged)
+        return (len(self.added) + len(self.changed) + len(self.removed)) / max(total, 1)
+
+    def summary(self):
+        return f"+{len(self.added)} ~{len(self.changed)} -{len(self.removed)} ({len(self.unchanged)} unchanged)"
+
+
+def plan_reindex(previous_dir, manifest):
+    """
+    Decides how to index a new input set against the current index version.
+    Returns (mode, diff) with mode "full", "incremental" or "unchanged"; diff is
+    None when there is no previous manifest to compare against.
+    """
+    previous = load_manifest(previous_dir) if previous_dir else None
+    if previous is None:
+        return "full", None
+    diff = ManifestDiff(previous, manifest)
+    if not diff.to_index and not diff.removed:
+        return "unchanged", diff
+    if not INCREMENTAL_INDEXING or diff.change_fraction() > INCREMENTAL_MAX_CHANGE_FRACTION:
+        return "full", diff
+    return "incremental", diff
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(v) for v in value]
+    return []
+
+
+def _read_table(directory, name):
+    if directory is None:
+        return None
+    path = os.path.join(directory, f"{name}.parquet")
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def _append(prev, new):
+    """Concatenates delta rows after the previous ones, continuing human_readable_id."""
+    if new is None or not len(new):
+        return prev.reset_index(drop=True)
+    if prev is None:
+        return new.reset_index(drop=True)
+    new = new.copy()
+    if "human_readable_id" in prev.columns and "human_readable_id" in new.columns:
+        start = int(prev["human_readable_id"].max()) + 1 if len(prev) else 0
+        new["human_readable_id"] = np.arange(start, start + len(new))
+    return pd.concat([prev, new], ignore_index=True)
+
+
+def _merge_description(old, new):
+    old, new = to_text(old), to_text(new)
+    if not new or new in old:
+        return old
+    if not old or old in new:
+        return new
+    return (new + "\n" + old)[:MERGED_DESCRIPTION_MAX_CHARS]
+
+
+def _merge_graph_rows(prev, delta, key, stale_units):
+    """
+    Merges entities (key title) or relationships (key source, target).
+
+    Previous rows lose the text units of stale documents and are dropped once no
+    text unit supports them; relationship weights shrink in proportion. Delta
+    rows whose key already exists are folded into the previous row, which keeps
+    its id. Returns (merged, {delta id: previous id}).
+    """
+    prev = prev.copy()
+    prev_units = prev["text_unit_ids"].map(_as_list)
+    kept = prev_units.map(lambda ids: [i for i in ids if i not in stale_units])
+    kept_counts = kept.map(len)
+    survived = (kept_counts > 0).to_numpy()
+    prev["text_unit_ids"] = kept
+    if "weight" in prev.columns:
+        fraction = kept_counts / prev_units.map(len).clip(lower=1)
+        prev["weight"] = prev["weight"].fillna(1.0).astype(float) * fraction
+    prev = prev[survived].reset_index(drop=True)
+
+    id_map = {}
+    if delta is None or not len(delta):
+        return prev, id_map
+    delta = delta.copy()
+    delta["text_unit_ids"] = delta["text_unit_ids"].map(_as_list)
+
+    prev_keys = pd.MultiIndex.from_frame(prev[key].astype(str))
+    delta_keys = pd.MultiIndex.from_frame(delta[key].astype(str))
+    positions = pd.Series(np.arange(len(prev)), index=prev_keys)
+    positions = positions[~positions.index.duplicated()]
+    overlap = delta_keys.isin(positions.index)
+
+    if overlap.any():
+        units = prev["text_unit_ids"].tolist()
+        descriptions = prev["description"].tolist() if "description" in prev.columns else None
+        weights = prev["weight"].tolist() if "weight" in prev.columns else None
+        updates = delta[overlap]
+        for p, row in zip(positions.reindex(delta_keys[overlap]).to_numpy(), updates.itertuples(index=False)):
+            seen = set(units[p])
+            units[p] = units[p] + [u for u in row.text_unit_ids if u not in seen]
+            if descriptions is not None:
+                descriptions[p] = _merge_description(descriptions[p], row.description)
+            if weights is not None:
+                weights[p] += float(row.weight) if pd.notna(row.weight) else 1.0
+            id_map[str(row.id)] = str(prev["id"].iat[p])
+        prev["text_unit_ids"] = units
+        if descriptions is not None:
+            prev["description"] = descriptions
+        if weights is not None:
+            prev["weight"] = weights
+
+    merged = _append(prev, delta[~overlap])
+    if "frequency" in merged.columns:
+        merged["frequency"] = merged["text_unit_ids"].map(len)
+    return merged, id_map
+
+
+def _merge_communities(prev, delta, alive_entities, alive_relationships, stale_units, id_maps, offset):
+    """
+    Keeps the previous communities (minus members that no longer exist) and
+    appends the delta run's communities renumbered past `offset`.
+    Previous communities are not re-clustered; a full run rebuilds them.
+    """
+    keep_members = {
+        "entity_ids": alive_entities,
+        "relationship_ids": alive_relationships,
+    }
+    if prev is not None and len(prev):
+        prev = prev.copy()
+        for column, alive in keep_members.items():
+            if column in prev.columns:
+                prev[column] = prev[column].map(lambda ids: [i for i in _as_list(ids) if i in alive])
+        if "text_unit_ids" in prev.columns:
+            prev["text_unit_ids"] = prev["text_unit_ids"].map(lambda ids: [i for i in _as_list(ids) if i not in stale_units])
+        if "entity_ids" in prev.columns:
+            prev = prev[prev["entity_ids"].map(len) > 0]
+            if "size" in prev.columns:
+                prev["size"] = prev["entity_ids"].map(len)
+        alive_communities = set(prev["community"].astype(int))
+        if "children" in prev.columns:
+            prev["children"] = prev["children"].map(lambda c: [int(x) for x in _as_list(c) if int(x) in alive_communities])
+
+    if delta is not None and len(delta):
+        delta = _offset_communities(delta, offset)
+        for column, id_map in id_maps.items():
+            if column in delta.columns:
+                delta[column] = delta[column].map(lambda ids: [id_map.get(i, i) for i in _as_list(ids)])
+        if "title" in delta.columns:
+            delta["title"] = "Community " + delta["community"].astype(str)
+    return pd.concat([prev, delta], ignore_index=True) if prev is not None else delta
+
+
+def _offset_communities(df, offset):
+    df = df.copy()
+    df["community"] = df["community"].astype(int) + offset
+    if "human_readable_id" in df.columns:
+        df["human_readable_id"] = df["community"]
+    if "parent" in df.columns:
+        parent = df["parent"].astype(int)
+        df["parent"] = parent.where(parent < 0, parent + offset)
+    if "children" in df.columns:
+        df["children"] = df["children"].map(lambda c: [int(x) + offset for x in _as_list(c)])
+    return df
+
+
+def _write_table(df, directory, name):
+    path = os.path.join(directory, f"{name}.parquet")
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def merge_artifacts(previous_dir, delta_dir, diff, out_dir):
+    """
+    Merges a delta indexing run (only the added / changed input files) into the
+    previous version's artifacts and writes the result to out_dir, which may be
+    delta_dir itself. delta_dir is None when files were only removed.
+
+    Rows derived from changed or removed documents are dropped, delta rows are
+    appended, entities and relationships are matched by title / endpoints and
+    degrees are recomputed. Communities and their reports are carried over
+    rather than re-clustered.
+    """
+    previous = {name: _read_table(previous_dir, name) for name in (
+        "documents", "text_units", "entities", "relationships", "communities", "community_reports", "covariates")}
+    delta = {name: _read_table(delta_dir, name) for name in previous}
+    merged = {}
+
+    # Documents and their text units
+    prev_docs = previous["documents"]
+    stale_titles = set(diff.stale)
+    stale_docs = set(prev_docs.loc[prev_docs["title"].isin(stale_titles), "id"].astype(str)) if prev_docs is not None else set()
+    if prev_docs is not None:
+        merged["documents"] = _append(prev_docs[~prev_docs["title"].isin(stale_titles)], delta["documents"])
+
+    prev_units = previous["text_units"]
+    stale_units = set()
+    if prev_units is not None:
+        is_stale = prev_units["document_ids"].map(lambda ids: any(d in stale_docs for d in _as_list(ids)))
+        stale_units = set(prev_units.loc[is_stale, "id"].astype(str))
+        prev_units = prev_units[~is_stale.to_numpy()]
+        if delta["text_units"] is not None:
+            prev_units = prev_units[~prev_units["id"].isin(delta["text_units"]["id"])]
+        merged["text_units"] = _append(prev_units, delta["text_units"])
+
+    # Graph
+    entities, entity_map = _merge_graph_rows(previous["entities"], delta["entities"], ["title"], stale_units)
+    titles = set(entities["title"].astype(str))
+    relationships, relationship_map = _merge_graph_rows(
+        previous["relationships"], delta["relationships"], ["source", "target"], stale_units)
+    relationships = relationships[
+        relationships["source"].astype(str).isin(titles) & relationships["target"].astype(str).isin(titles)
+    ].reset_index(drop=True)
+
+    endpoint_counts = pd.concat([relationships["source"], relationships["target"]]).astype(str).value_counts()
+    if "degree" in entities.columns:
+        entities["degree"] = entities["title"].astype(str).map(endpoint_counts).fillna(0).astype(int)
+    if "combined_degree" in relationships.columns:
+        relationships["combined_degree"] = (
+            relationships["source"].astype(str).map(endpoint_counts).fillna(0)
+            + relationships["target"].astype(str).map(endpoint_counts).fillna(0)
+        ).astype(int)
+    merged["entities"] = entities
+    merged["relationships"] = relationships
+
+    id_maps = {"entity_ids": entity_map, "relationship_ids": relationship_map}
+    if "text_units" in merged:
+        for column, id_map in id_maps.items():
+            if column in merged["text_units"].columns and id_map:
+                merged["text_units"][column] = merged["text_units"][column].map(
+                    lambda ids, m=id_map: [m.get(i, i) for i in _as_list(ids)])
+
+    # Communities
+    alive_entities = set(entities["id"].astype(str))
+    alive_relationships = set(relationships["id"].astype(str))
+    prev_communities = previous["communities"]
+    offset = int(prev_communities["community"].max()) + 1 if prev_communities is not None and len(prev_communities) else 0
+    if prev_communities is not None or delta["communities"] is not None:
+        merged["communities"] = _merge_communities(
+            prev_communities, delta["communities"], alive_entities, alive_relationships, stale_units, id_maps, offset)
+        alive_communities = set(merged["communities"]["community"].astype(int))
+        prev_reports = previous["community_reports"]
+        if prev_reports is not None:
+            prev_reports = prev_reports[prev_reports["community"].astype(int).isin(alive_communities)]
+        delta_reports = delta["community_reports"]
+        if delta_reports is not None:
+            delta_reports = _offset_communities(delta_reports, offset)
+        if prev_reports is not None or delta_reports is not None:
+            merged["community_reports"] = pd.concat([prev_reports, delta_reports], ignore_index=True)
+
+    if previous["covariates"] is not None or delta["covariates"] is not None:
+        prev_covariates = previous["covariates"]
+        if prev_covariates is not None:
+            prev_covariates = prev_covariates[~prev_covariates["text_unit_id"].astype(str).isin(stale_units)]
+        merged["covariates"] = _append(prev_covariates, delta["covariates"])
+
+    # Vector tables: drop vectors of removed rows and of rows the delta re-embedded
+    dropped = {
+        "entity": (set(previous["entities"]["id"].astype(str)) - alive_entities) | set(entity_map.values()),
+        "text_unit": stale_units,
+        "community": set(),
+    }
+    if previous["community_reports"] is not None and "community_reports" in merged:
+        dropped["community"] = set(previous["community_reports"]["id"].astype(str)) - set(merged["community_reports"]["id"].astype(str))
+    lancedb_tables = _merge_lancedb(previous_dir, delta_dir, dropped, {"entity": entity_map})
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, df in merged.items():
+        _write_table(df, out_dir, name)
+    if lancedb_tables is not None:
+        _write_lancedb(lancedb_tables, os.path.join(out_dir, "lancedb"))
+
+    print(f"✅ Merged incremental index ({diff.summary()}): "
+          f"{len(entities)} entities, {len(relationships)} relationships, {len(merged.get('text_units', []))} text units")
+    return merged
+
+
+def _merge_lancedb(previous_dir, delta_dir, dropped, id_maps):
+    """Merged GraphRAG embedding tables as {table name: pyarrow.Table}, or None without LanceDB."""
+    previous_uri = find_lancedb_uri(previous_dir)
+    delta_uri = find_lancedb_uri(delta_dir) if delta_dir else None
+    if previous_uri is None and delta_uri is None:
+        return None
+    try:
+        import lancedb
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        print("⚠️  The 'lancedb' package is not installed; embedding tables were not merged")
+        return None
+
+    previous_db = lancedb.connect(previous_uri) if previous_uri else None
+    delta_db = lancedb.connect(delta_uri) if delta_uri else None
+    names = set(previous_db.table_names() if previous_db else []) | set(delta_db.table_names() if delta_db else [])
+    tables = {}
+    for name in names:
+        kind = next((k for k, table in LANCEDB_TABLES.items() if name.endswith(table)), None)
+        parts = []
+        if previous_db is not None and name in previous_db.table_names():
+            table = previous_db.open_table(name).to_arrow()
+            drop = dropped.get(kind) or set()
+            if drop:
+                table = table.filter(pc.invert(pc.is_in(table["id"], value_set=pa.array(sorted(drop), pa.string()))))
+            parts.append(table)
+        if delta_db is not None and name in delta_db.table_names():
+            table = delta_db.open_table(name).to_arrow()
+            id_map = id_maps.get(kind)
+            if id_map:
+                ids = pa.array([id_map.get(i, i) for i in table["id"].to_pylist()], pa.string())
+                table = table.set_column(table.schema.get_field_index("id"), "id", ids)
+            parts.append(table.cast(parts[0].schema) if parts else table)
+        tables[name] = pa.concat_tables(parts)
+    return tables
+
+
+def _write_lancedb(tables, uri):
+    import lancedb
+
+    tmp_uri = f"{uri}.tmp"
+    shutil.rmtree(tmp_uri, ignore_errors=True)
+    db = lancedb.connect(tmp_uri)
+    for name, table in tables.items():
+        db.create_table(name, data=table, mode="overwrite")
+    shutil.rmtree(uri, ignore_errors=True)
+    os.replace(tmp_uri, uri)
@@ -0,0 +1,142 @@
+import os
+import glob
+import shutil
+import threading
+import time
+import uuid
+
+# Completed indexing runs are published under <root>/versions/<version> and the
+# "CURRENT" file names the one readers should use. A version directory is never
+# modified after it is published (derived caches such as the graph layout may be
+# added next to the artifacts).
+GRAPHRAG_ROOT = os.environ.get("GRAPHRAG_ROOT", "ragtest")
+VERSIONS_DIR = os.path.join(GRAPHRAG_ROOT, "versions")
+CURRENT_POINTER = "CURRENT"
+# Published versions kept on disk, including the current one; older ones are removed
+INDEX_VERSION_RETENTION = int(os.environ.get("INDEX_VERSION_RETENTION", "3"))
+
+_STAGING_SUFFIX = ".staging"
+
+_pointer_lock = threading.Lock()
+_pointer_cache = {}  # pointer path -> ((inode, mtime_ns, size), resolved dir)
+_publish_lock = threading.Lock()
+
+
+def _pointer_path(versions_dir):
+    return os.path.join(versions_dir, CURRENT_POINTER)
+
+
+def resolve_current_version(versions_dir=VERSIONS_DIR):
+    """
+    Directory of the current published index version, or None if nothing has
+    been published yet. Costs one stat() unless the pointer changed.
+    """
+    path = _pointer_path(versions_dir)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _pointer_lock:
+        cached = _pointer_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    resolved = os.path.abspath(os.path.join(versions_dir, name)) if name else None
+    if resolved and not os.path.isdir(resolved):
+        print(f"⚠️  Index pointer {path} names a missing version: {name}")
+        resolved = None
+    with _pointer_lock:
+        _pointer_cache[path] = (signature, resolved)
+    return resolved
+
+
+def _write_pointer(versions_dir, name):
+    """Flips CURRENT to `name` with a single atomic rename."""
+    path = _pointer_path(versions_dir)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def find_artifacts_dir(output_root):
+    """
+    Where a graphrag run left its parquet artifacts: directly in output_root
+    (flat layout), or the newest subdirectory holding entities.parquet
+    (timestamped layout). Only used when publishing, or before the first publish.
+    """
+    if os.path.exists(os.path.join(output_root, "entities.parquet")):
+        return str(output_root)
+    candidates = []
+    for pattern in ("*", os.path.join("*", "artifacts")):
+        for d in glob.glob(os.path.join(output_root, pattern)):
+            if os.path.exists(os.path.join(d, "entities.parquet")):
+                candidates.append(d)
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
+
+def list_versions(versions_dir=VERSIONS_DIR):
+    """Published version names, oldest first."""
+    try:
+        entries = [e for e in os.scandir(versions_dir) if e.is_dir() and not e.name.endswith(_STAGING_SUFFIX)]
+    except OSError:
+        return []
+    return [e.name for e in sorted(entries, key=lambda e: e.name)]
+
+
+def publish_version(source_dir, versions_dir=VERSIONS_DIR, retention=INDEX_VERSION_RETENTION, lancedb_dir=None):
+    """
+    Copies a completed GraphRAG output directory into a new immutable version and
+    makes it current. The copy is staged under a temporary name and renamed into
+    place before the pointer flips, so readers only ever see complete versions
+    and keep serving the previous one until then. `lancedb_dir`, when it lives
+    outside source_dir (timestamped layout), is copied in as <version>/lancedb
+    so the version's embeddings are as immutable as its tables.
+    Returns the new version's path.
+    """
+    with _publish_lock:
+        os.makedirs(versions_dir, exist_ok=True)
+        # Sortable by name: timestamp with sub-second precision, then a random suffix
+        now = time.time_ns()
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10**9))}-{now % 10**9:09d}-{uuid.uuid4().hex[:6]}"
+        staging = os.path.join(versions_dir, name + _STAGING_SUFFIX)
+        final = os.path.join(versions_dir, name)
+
+        print(f"📦 Publishing index version {name} from {source_dir}...")
+        # Copy, not hard-link: graphrag rewrites its output files in place on the next run
+        shutil.copytree(source_dir, staging)
+        if lancedb_dir and not os.path.exists(os.path.join(staging, "lancedb")):
+            shutil.copytree(lancedb_dir, os.path.join(staging, "lancedb"))
+        os.replace(staging, final)
+        _write_pointer(versions_dir, name)
+        print(f"✅ Index version {name} is now current")
+
+        _prune_versions(versions_dir, keep=retention, current=name)
+        return os.path.abspath(final)
+
+
+def _prune_versions(versions_dir, keep, current):
+    old = [v for v in list_versions(versions_dir) if v != current]
+    for name in old[:max(len(old) - (keep - 1), 0)]:
+        shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+    # Leftovers from a publish that died mid-copy
+    for entry in os.scandir(versions_dir):
+        if entry.is_dir() and entry.name.endswith(_STAGING_SUFFIX):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def clear_versions(versions_dir=VERSIONS_DIR):
+    """Removes every published version and the pointer."""
+    with _publish_lock:
+        shutil.rmtree(versions_dir, ignore_errors=True)
+        with _pointer_lock:
+            _pointer_cache.pop(_pointer_path(versions_dir), None)
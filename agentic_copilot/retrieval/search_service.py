@@ -0,0 +1,190 @@
+import os
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+
+# Methods understood by graphrag.api. The copilot's selector also emits "community",
+# which is answered from community reports, i.e. GraphRAG's global search.
+SEARCH_METHOD_ALIASES = {
+    "local": "local",
+    "global": "global",
+    "drift": "drift",
+    "basic": "basic",
+    "community": "global",
+}
+
+DEFAULT_RESPONSE_TYPE = "Multiple Paragraphs"  # same default as `graphrag query`
+
+
+class GraphRAGSearchService:
+    """
+    Long-lived, in-process replacement for `graphrag query --root ragtest`.
+
+    The graphrag import, the parsed settings.yaml and the artifact tables are kept
+    warm across requests (tables come from the shared ArtifactStore), so a query
+    only pays for the search itself. Each index version gets its own copy of the
+    config whose LanceDB vector store points into that version's directory, so
+    local / DRIFT search never read the live output a running job is rewriting.
+
+    The search engines themselves (context builders, vector store handles, LLM
+    clients) are still built by graphrag.api on every call: building them directly
+    needs graphrag's internal factories, which change between releases. All searches run on one background event loop,
+    which lets synchronous LangGraph nodes call in even when they are themselves
+    executing inside the FastAPI event loop.
+    """
+
+    def __init__(self, root_dir="ragtest", community_level=2, response_type=DEFAULT_RESPONSE_TYPE):
+        self.root_dir = Path(root_dir)
+        self.community_level = community_level
+        self.response_type = response_type
+        self._lock = threading.Lock()
+        self._config = None
+        self._config_signature = None
+        self._loop = None
+        self._loop_thread = None
+
+    def _settings_signature(self):
+        signature = []
+        for name in ("settings.yaml", "settings.yml", "settings.json", ".env"):
+            path = self.root_dir / name
+            if path.exists():
+                st = path.stat()
+                signature.append((name, st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def get_config(self, output_dir=None):
+        """
+        Parses settings.yaml once, re-parsing only if the file changes. With an
+        output_dir, returns the config for that index version (cached with its tables).
+        """
+        from graphrag.config.load_config import load_config
+
+        signature = self._settings_signature()
+        with self._lock:
+            if self._config is None or signature != self._config_signature:
+                print(f"DEBUG: Loading GraphRAG config from {self.root_dir.resolve()}")
+                self._config = load_config(self.root_dir.resolve())
+                self._config_signature = signature
+            config = self._config
+        if output_dir is None:
+            return config
+
+        # Keyed by the settings too, so editing settings.yaml rebuilds every version's copy
+        name = "graphrag_config:" + hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:12]
+        return get_artifact_store().get_derived(
+            output_dir, name, lambda d: self._version_config(config, d), depends_on=("entities",)
+        )
+
+    @staticmethod
+    def _version_config(config, output_dir):
+        """Copy of the config whose LanceDB stores read <output_dir>/lancedb."""
+        config = config.model_copy(deep=True)
+        db_uri = os.path.join(str(output_dir), "lancedb")
+        for store in (getattr(config, "vector_store", None) or {}).values():
+            if getattr(store, "type", None) == "lancedb":
+                store.db_uri = db_uri
+        return config
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or not self._loop_thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="graphrag-search-loop", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def _tables(self, output_dir, names):
+        store = get_artifact_store()
+        tables = {}
+        for name in names:
+            df = store.get_table(output_dir, name)
+            if df is None:
+                raise FileNotFoundError(f"{name}.parquet not found in {output_dir}")
+            tables[name] = df
+        return tables
+
+    async def asearch(self, query, output_dir, method="local"):
+        """Runs one GraphRAG search and returns the response text."""
+        import graphrag.api as api
+
+        method = SEARCH_METHOD_ALIASES.get(method, method)
+        config = self.get_config(output_dir)
+
+        if method == "local":
+            t = self._tables(output_dir, ["entities", "communities", "community_reports", "text_units", "relationships"])
+            response, _ = await api.local_search(
+                config=config,
+                entities=t["entities"],
+                communities=t["communities"],
+                community_reports=t["community_reports"],
+                text_units=t["text_units"],
+                relationships=t["relationships"],
+                covariates=get_artifact_store().get_table(output_dir, "covariates"),
+                community_level=self.community_level,
+                response_type=self.response_type,
+                query=query,
+            )
+        elif method == "global":
+            t = self._tables(output_dir, ["entities", "communities", "community_reports"])
+            response, _ = await api.global_search(
+                config=config,
+                entities=t["entities"],
+                communities=t["communities"],
+                community_reports=t["community_reports"],
+                community_level=self.community_level,
+                dynamic_community_selection=False,
+                response_type=self.response_type,
+                query=query,
+            )
+        elif method == "drift":
+            t = self._tables(output_dir, ["entities", "communities", "community_reports", "text_units", "relationships"])
+            response, _ = await api.drift_search(
+                config=config,
+                entities=t["entities"],
+                communities=t["communities"],
+                community_reports=t["community_reports"],
+                text_units=t["text_units"],
+                relationships=t["relationships"],
+                community_level=self.community_level,
+                response_type=self.response_type,
+                query=query,
+            )
+        elif method == "basic":
+            t = self._tables(output_dir, ["text_units"])
+            response, _ = await api.basic_search(
+                config=config,
+                text_units=t["text_units"],
+                query=query,
+            )
+        else:
+            raise ValueError(f"Unknown GraphRAG search method: {method}")
+
+        # The CLI prints the response, so its stdout is the response plus a newline
+        return f"{response}\n"
+
+    def search(self, query, output_dir, method="local", timeout=None):
+        """Synchronous wrapper around asearch() that is safe to call from any thread."""
+        future = asyncio.run_coroutine_threadsafe(self.asearch(query, output_dir, method), self._ensure_loop())
+        return future.result(timeout=timeout)
+
+    async def search_async(self, query, output_dir, method="local"):
+        """Awaitable from any event loop; the search itself runs on the service loop."""
+        future = asyncio.run_coroutine_threadsafe(self.asearch(query, output_dir, method), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_search_service(root_dir="ragtest", community_level=2):
+    """Returns the shared GraphRAGSearchService, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None or _service.root_dir != Path(root_dir):
+            _service = GraphRAGSearchService(root_dir=root_dir, community_level=community_level)
+        return _service
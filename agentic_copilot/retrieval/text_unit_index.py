@@ -0,0 +1,63 @@
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+
+
+def as_id_list(value):
+    """
+    Robustly converts a parquet id cell (numpy array, list, single string, None)
+    into a plain Python list of ids.
+    """
+    if value is None:
+        return []
+    if hasattr(value, 'tolist'):  # numpy array
+        value = value.tolist()
+    if isinstance(value, str):  # single id as string
+        return [value]
+    if isinstance(value, list):
+        return value
+    try:
+        return list(value)
+    except TypeError:
+        return [value]
+
+
+class TextUnitIndex:
+    """
+    Hash index from text-unit id to row offset in text_units.parquet.
+    Lookups cost O(number of ids requested), independent of corpus size.
+    """
+
+    def __init__(self, df_text):
+        self.ids = df_text['id'].tolist()
+        self.texts = df_text['text'].tolist()
+        self.offsets = {tid: i for i, tid in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_for(self, ids):
+        """Sorted, de-duplicated row offsets for the given ids (unknown ids are ignored)."""
+        offsets = self.offsets
+        return sorted({offsets[i] for i in as_id_list(ids) if i in offsets})
+
+    def gather(self, ids):
+        """
+        Returns [(id, text), ...] for the given ids in text_units.parquet order,
+        matching the previous df_text[df_text['id'].isin(ids)] semantics.
+        """
+        return [(self.ids[r], self.texts[r]) for r in self.rows_for(ids)]
+
+    def gather_many(self, id_lists):
+        """Batched gather: one [(id, text), ...] list per input id list."""
+        return [self.gather(ids) for ids in id_lists]
+
+
+def _build_text_unit_index(output_dir):
+    df_text = get_artifact_store().get_table(output_dir, "text_units")
+    if df_text is None:
+        return None
+    return TextUnitIndex(df_text)
+
+
+def get_text_unit_index(output_dir):
+    """Returns the cached TextUnitIndex for the current text_units table, or None."""
+    return get_artifact_store().get_derived(output_dir, "text_unit_index", _build_text_unit_index, depends_on=("text_units",))
@@ -0,0 +1,52 @@
+import re
+from collections import Counter
+
+# Splits identifiers like AccountSlackNotifyJob / HTTPRequestHandler / Account_Feedback__c
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_IDENT_RE = re.compile(r"\w+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text):
+    """
+    Returns the set of lowercase tokens for a piece of text.
+
+    Whole identifiers are kept as tokens alongside their camelCase and
+    underscore-separated parts, so "AccountSlackNotifyJob" yields
+    {"accountslacknotifyjob", "account", "slack", "notify", "job"}.
+    """
+    if not text:
+        return set()
+    tokens = set()
+    for ident in _IDENT_RE.findall(text):
+        tokens |= _identifier_tokens(ident)
+    return tokens
+
+
+def _identifier_tokens(ident):
+    tokens = {ident.lower()}
+    for word in _WORD_RE.findall(ident):
+        tokens.add(word.lower())
+        for part in _CAMEL_RE.findall(word):
+            tokens.add(part.lower())
+    return tokens
+
+
+def token_counts(text):
+    """
+    Term frequencies for a piece of text, using the same tokens as tokenize().
+    Each identifier occurrence counts once per token it yields.
+    """
+    counts = Counter()
+    if not text:
+        return counts
+    for ident in _IDENT_RE.findall(text):
+        counts.update(_identifier_tokens(ident))
+    return counts
+
+
+def to_text(value):
+    # Descriptions can be lists/arrays after summarization; match the old str() behaviour
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
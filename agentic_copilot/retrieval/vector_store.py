@@ -0,0 +1,238 @@
+import os
+import hashlib
+import numpy as np
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+from agentic_copilot.retrieval.tokenize import token_counts, to_text
+from agentic_copilot.cache.lru_cache import PersistentLRUCache, normalize_query, make_key
+
+# graphrag: query vectors from the embedding model settings.yaml used at index time, searched in LanceDB
+# hashing: deterministic local embedder over an in-memory index (tests / offline runs)
+VECTOR_EMBEDDER = os.environ.get("VECTOR_EMBEDDER", "graphrag")
+GRAPHRAG_ROOT = os.environ.get("GRAPHRAG_ROOT", "ragtest")
+HASHING_EMBEDDER_DIM = 512
+VECTOR_TOP_K = int(os.environ.get("VECTOR_TOP_K", "8"))
+
+# Container prefix from settings.yaml (vector_store.default_vector_store.container_name)
+LANCEDB_CONTAINER = os.environ.get("GRAPHRAG_VECTOR_CONTAINER", "default")
+# Embedding tables GraphRAG writes at index time, by the kind of item they hold
+LANCEDB_TABLES = {
+    "entity": "entity-description",
+    "text_unit": "text_unit-text",
+    "community": "community-full_content",
+}
+
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder (signed token hashes, L2-normalised).
+    No network and no model download; same text always gives the same vector.
+    Implements the embed_query / embed_documents interface of LangChain embeddings.
+    """
+
+    def __init__(self, dim=HASHING_EMBEDDER_DIM):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token, tf in token_counts(text).items():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + np.log(tf))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_query(self, text):
+        return self._embed(text).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text).tolist() for text in texts]
+
+
+def create_embedder(kind=VECTOR_EMBEDDER):
+    """
+    Builds the configured query embedder (anything with embed_query works), or
+    None when no embedder matching the index-time vectors is available.
+    """
+    if kind == "hashing":
+        return HashingEmbedder()
+    return graphrag_query_embedder()
+
+
+def graphrag_query_embedder(root_dir=GRAPHRAG_ROOT):
+    """
+    LangChain embeddings for the model GraphRAG embedded the index with
+    (settings.yaml embed_text.model_id), with the same credentials and endpoint.
+    Query vectors from any other model would not be comparable, so returns None
+    when that model cannot be determined or set up.
+    """
+    try:
+        from agentic_copilot.retrieval.search_service import get_search_service
+        config = get_search_service(root_dir=root_dir).get_config()
+    except ImportError:
+        print("⚠️  The 'graphrag' package is not installed; cannot tell which model embedded the index")
+        return None
+    except Exception as e:
+        print(f"⚠️  Could not load the GraphRAG config from {root_dir}: {e}")
+        return None
+
+    try:
+        model = config.get_language_model_config(config.embed_text.model_id)
+        provider = str(getattr(model, "model_provider", None) or getattr(model, "type", "") or "").lower()
+        if "azure" in provider:
+            from langchain_openai import AzureOpenAIEmbeddings
+            return AzureOpenAIEmbeddings(
+                model=model.model,
+                azure_deployment=getattr(model, "deployment_name", None) or model.model,
+                azure_endpoint=model.api_base,
+                api_key=model.api_key,
+                api_version=model.api_version,
+            )
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=model.model, api_key=model.api_key, base_url=model.api_base or None)
+    except Exception as e:
+        print(f"⚠️  Could not set up the GraphRAG embedding model for queries: {e}")
+        return None
+
+
+class NumpyVectorIndex:
+    """Brute-force cosine index held in memory; used with the local embedder."""
+
+    def __init__(self, ids, texts, vectors):
+        self.ids = list(ids)
+        self.texts = list(texts)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(self.ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, vector, k=VECTOR_TOP_K):
+        if not self.ids:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        similarities = self.matrix @ (query / norm if norm else query)
+        k = min(k, len(self.ids))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        # Non-positive cosine similarity means nothing in common
+        return [
+            {"id": self.ids[i], "text": self.texts[i], "distance": float(1.0 - similarities[i])}
+            for i in top
+            if similarities[i] > 0
+        ]
+
+
+class LanceDBVectorIndex:
+    """Nearest-neighbour search over one GraphRAG LanceDB embedding table (opened once)."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.count_rows()
+
+    def search(self, vector, k=VECTOR_TOP_K):
+        rows = self.table.search(list(vector)).select(["id", "text"]).limit(k).to_list()
+        return [{"id": row["id"], "text": row["text"], "distance": float(row["_distance"])} for row in rows]
+
+
+def find_lancedb_uri(output_dir):
+    """LanceDB directory for an output dir: output/lancedb, next to timestamped runs or flat."""
+    for candidate in (os.path.join(output_dir, "lancedb"), os.path.join(os.path.dirname(output_dir), "lancedb")):
+        if os.path.isdir(candidate):
+            return candidate
+    return None
+
+
+def open_lancedb_indexes(uri):
+    """Opens the GraphRAG embedding tables found in a LanceDB directory, keyed by kind."""
+    import lancedb
+
+    db = lancedb.connect(uri)
+    names = set(db.table_names())
+    indexes = {}
+    for kind, table in LANCEDB_TABLES.items():
+        for name in (f"{LANCEDB_CONTAINER}-{table}", table):
+            if name in names:
+                indexes[kind] = LanceDBVectorIndex(db.open_table(name))
+                break
+    return indexes
+
+
+def build_local_indexes(output_dir, embedder):
+    """Embeds entities and text units with the local embedder into in-memory indexes."""
+    store = get_artifact_store()
+    indexes = {}
+    df_text = store.get_table(output_dir, "text_units")
+    if df_text is not None:
+        texts = [to_text(t) for t in df_text["text"].tolist()]
+        indexes["text_unit"] = NumpyVectorIndex(df_text["id"].tolist(), texts, embedder.embed_documents(texts))
+    df_entities = store.get_table(output_dir, "entities")
+    if df_entities is not None:
+        # Same "title:description" text GraphRAG embeds for entity-description
+        texts = [f"{to_text(t)}:{to_text(d)}" for t, d in zip(df_entities["title"], df_entities["description"])]
+        indexes["entity"] = NumpyVectorIndex(df_entities["id"].tolist(), texts, embedder.embed_documents(texts))
+    return indexes
+
+
+class VectorRetriever:
+    """
+    In-process semantic search: embeds the query once (cached) and runs
+    nearest-neighbour search against each requested index.
+    """
+
+    def __init__(self, embedder, indexes):
+        self.embedder = embedder
+        self.indexes = indexes
+        self._query_vectors = PersistentLRUCache(max_entries=1024, ttl_seconds=None)
+
+    def embed(self, query):
+        key = make_key("query_vector", getattr(self.embedder, "model", ""), normalize_query(query))
+        vector = self._query_vectors.get(key)
+        if vector is None:
+            vector = self.embedder.embed_query(query)
+            self._query_vectors.set(key, vector)
+        return vector
+
+    def search_vector(self, vector, kinds=("text_unit", "entity"), k=VECTOR_TOP_K):
+        """Returns {kind: [{"id", "text", "distance"}, ...]} nearest first, for a precomputed vector."""
+        return {kind: self.indexes[kind].search(vector, k) for kind in kinds if kind in self.indexes}
+
+    def search(self, query, kinds=("text_unit", "entity"), k=VECTOR_TOP_K):
+        return self.search_vector(self.embed(query), kinds=kinds, k=k)
+
+
+def _build_vector_retriever(output_dir, kind=VECTOR_EMBEDDER):
+    if kind == "hashing":
+        embedder = create_embedder(kind)
+        return VectorRetriever(embedder, build_local_indexes(output_dir, embedder))
+
+    uri = find_lancedb_uri(output_dir)
+    if uri is None:
+        print(f"DEBUG: No LanceDB directory found for {output_dir}; vector search disabled")
+        return None
+    try:
+        indexes = open_lancedb_indexes(uri)
+    except ImportError:
+        print("⚠️  The 'lancedb' package is not installed; vector search disabled")
+        return None
+    if not indexes:
+        print(f"DEBUG: No GraphRAG embedding tables in {uri}; vector search disabled")
+        return None
+    embedder = create_embedder(kind)
+    if embedder is None:
+        print("DEBUG: No query embedder matching the index; vector search disabled")
+        return None
+    print(f"DEBUG: Opened LanceDB tables {sorted(indexes)} from {uri}")
+    return VectorRetriever(embedder, indexes)
+
+
+def get_vector_retriever(output_dir):
+    """Returns the cached VectorRetriever for the current index version, or None."""
+    return get_artifact_store().get_derived(
+        output_dir, "vector_retriever", _build_vector_retriever, depends_on=("entities", "text_units")
+    )
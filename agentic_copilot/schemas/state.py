@@ -12,16 +12,19 @@ class GlobalState(TypedDict):
     Attributes:
         user_query: The original query from the user.
         intent: The classified intent of the query (e.g., "explain", "refactor").
+        search_method: GraphRAG search method chosen by the router ("local", "global", "community").
         rag_context: List of strings retrieved from document RAG.
         graphrag_context: List of strings retrieved from code GraphRAG.
         tool_results: List of outputs from tool executions.
         risk_signals: List of risk factors identified.
         merged_insights: Consolidated insights from all subgraphs.
         final_answer: The final response generated for the user.
+        context_budget: Token budget report for the final reasoning prompt (tokens used/dropped).
     """
     # Use custom reducer to prevent concurrent update errors
     user_query: Annotated[str, _keep_first]
     intent: Annotated[str, _keep_first]
+    search_method: Annotated[Optional[str], _keep_first]
     
     # Reducers: append new items to the list
     rag_context: Annotated[List[str], operator.add]
@@ -33,3 +36,4 @@ class GlobalState(TypedDict):
     
     # final_answer can be updated multiple times, last write wins
     final_answer: Annotated[str, _keep_first]
+    context_budget: Annotated[Optional[dict], _keep_first]
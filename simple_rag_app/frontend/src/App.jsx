@@ -8,6 +8,8 @@ import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
 import GraphView from './GraphView';
 
+const ARCHIVE_PATTERN = /\.(zip|tar|tar\.gz|tgz|tar\.bz2|tbz2|tar\.xz|txz)$/i;
+
 // Custom Code Block Component with Copy Functionality
 const CodeBlock = ({ node, inline, className, children, ...props }) => {
     const match = /language-(\w+)/.exec(className || '');
@@ -85,6 +87,14 @@ function App() {
         "Finalizing output..."
     ];
 
+    // Real pipeline progress from /api/query/stream (overrides the simulated steps)
+    const [thinkingLabel, setThinkingLabel] = useState(null);
+    const progressLabels = {
+        intent_analyzer: "Query routed. Searching the knowledge graph...",
+        graphrag_agent: "Context retrieved. Synthesizing answer...",
+        final_reasoner: "Finalizing output..."
+    };
+
     const chatEndRef = useRef(null);
 
     const scrollToBottom = () => {
@@ -170,29 +180,46 @@ function App() {
                     setIsIngesting(false);
                     return;
                 }
+                // A single archive is sent as one part and extracted on the server
                 const formData = new FormData();
-                for (let i = 0; i < selectedFiles.length; i++) {
-                    const file = selectedFiles[i];
-                    if (file.webkitRelativePath.includes("node_modules") || file.webkitRelativePath.includes(".git")) continue;
-                    formData.append('files', file);
+                if (selectedFiles.length === 1 && ARCHIVE_PATTERN.test(selectedFiles[0].name)) {
+                    formData.append('archive', selectedFiles[0]);
+                    response = await fetch('http://localhost:8000/api/ingest/archive', {
+                        method: 'POST',
+                        body: formData
+                    });
+                } else {
+                    for (let i = 0; i < selectedFiles.length; i++) {
+                        const file = selectedFiles[i];
+                        if (file.webkitRelativePath.includes("node_modules") || file.webkitRelativePath.includes(".git")) continue;
+                        formData.append('files', file);
+                    }
+                    response = await fetch('http://localhost:8000/api/ingest/upload', {
+                        method: 'POST',
+                        body: formData
+                    });
                 }
-                response = await fetch('http://localhost:8000/api/ingest/upload', {
-                    method: 'POST',
-                    body: formData
-                });
             }
 
             const data = await response.json();
-            if (response.ok) {
-                setIngestStatus({ message: 'Graph Construction Complete.', type: 'success' });
+            if (!response.ok) {
+                setIngestStatus({ message: `Construction Failed: ${data.detail}`, type: 'error' });
+                return;
+            }
+
+            // Indexing runs as a background job; follow its progress until it finishes
+            setIngestStatus({ message: data.message, type: 'info' });
+            const job = await waitForJob(data.job_id);
+            if (job.status === 'succeeded') {
+                setIngestStatus({ message: `Graph Construction Complete (${job.elapsed_seconds}s).`, type: 'success' });
                 setMessages(prev => [...prev, {
                     id: Date.now(),
-                    text: `**System Update**\n\nIngested ${data.processed_files || 'codebase'} nodes into the collective intelligence graph. Ready for analysis.`,
+                    text: `**System Update**\n\nIngested ${job.files_staged || 'codebase'} files into the collective intelligence graph. Ready for analysis.`,
                     sender: 'bot',
                     timestamp: new Date().toLocaleTimeString()
                 }]);
             } else {
-                setIngestStatus({ message: `Construction Failed: ${data.detail}`, type: 'error' });
+                setIngestStatus({ message: `Construction Failed: ${job.error}`, type: 'error' });
             }
         } catch (error) {
             setIngestStatus({ message: `Connection Error: ${error.message}`, type: 'error' });
@@ -201,6 +228,20 @@ function App() {
         }
     };
 
+    const waitForJob = async (jobId) => {
+        while (true) {
+            const response = await fetch(`http://localhost:8000/api/jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.detail);
+            if (job.status === 'succeeded' || job.status === 'failed') return job;
+
+            const done = job.workflows.filter(w => w.status === 'completed').length;
+            const progress = job.status === 'indexing' ? ` (${done}/${job.workflows.length} workflows)` : '';
+            setIngestStatus({ message: `${job.message}${progress}...`, type: 'info' });
+            await new Promise(resolve => setTimeout(resolve, 2000));
+        }
+    };
+
     const handleSendQuery = async () => {
         if (!inputQuery.trim()) return;
 
@@ -214,34 +255,78 @@ function App() {
         setInputQuery('');
         setIsThinking(true);
 
+        const botId = Date.now() + 1;
+        let botStarted = false;
+
+        // Append streamed text to the bot message, creating it on the first token
+        const appendToBot = (text) => {
+            if (!botStarted) {
+                botStarted = true;
+                setIsThinking(false);
+                setMessages(prev => [...prev, {
+                    id: botId,
+                    text,
+                    sender: 'bot',
+                    timestamp: new Date().toLocaleTimeString()
+                }]);
+                return;
+            }
+            setMessages(prev => prev.map(m => (m.id === botId ? { ...m, text: m.text + text } : m)));
+        };
+
+        const handleEvent = (event, data) => {
+            if (event === 'progress') {
+                const label = progressLabels[data.node];
+                if (label) setThinkingLabel(label);
+            } else if (event === 'token') {
+                appendToBot(data.text);
+            } else if (event === 'error') {
+                appendToBot(`Error retrieving knowledge: ${data.detail}`);
+            }
+        };
+
         try {
-            const response = await fetch('http://localhost:8000/api/query', {
+            // Server-sent events: progress per pipeline stage, then answer tokens
+            const response = await fetch('http://localhost:8000/api/query/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ query: userMsg.text })
             });
 
-            const data = await response.json();
+            if (!response.ok || !response.body) {
+                appendToBot("Error retrieving knowledge.");
+                return;
+            }
 
-            setTimeout(() => {
-                setMessages(prev => [...prev, {
-                    id: Date.now() + 1,
-                    text: response.ok ? data.response : "Error retrieving knowledge.",
-                    sender: 'bot',
-                    timestamp: new Date().toLocaleTimeString(),
-                    // We don't save steps anymore as per new UI request, just the result
-                }]);
-                setIsThinking(false);
-            }, 800);
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const rawEvent = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+
+                    let event = 'message';
+                    let data = '';
+                    for (const line of rawEvent.split('\n')) {
+                        if (line.startsWith('event: ')) event = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
+                    }
+                    if (data) handleEvent(event, JSON.parse(data));
+                }
+            }
 
         } catch (error) {
-            setMessages(prev => [...prev, {
-                id: Date.now() + 1,
-                text: `Connection Error: ${error.message}`,
-                sender: 'bot',
-                timestamp: new Date().toLocaleTimeString()
-            }]);
+            appendToBot(`Connection Error: ${error.message}`);
+        } finally {
             setIsThinking(false);
+            setThinkingLabel(null);
         }
     };
 
@@ -291,7 +376,7 @@ function App() {
                             >
                                 <UploadCloud size={32} color={isDragActive ? '#34d399' : '#9cc2c0'} style={{ marginBottom: '0.5rem' }} />
                                 <p style={{ fontWeight: 500, color: 'var(--text-primary)' }}>
-                                    {selectedFiles ? `${selectedFiles.length} files selected` : "Drag files/folder here"}
+                                    {selectedFiles ? `${selectedFiles.length} files selected` : "Drag files/folder or a .zip/.tar.gz here"}
                                 </p>
                                 <p style={{ fontSize: '0.75rem', color: 'var(--text-secondary)' }}>or click to browse</p>
                                 <input
@@ -394,7 +479,7 @@ function App() {
                                             <div className="thinking-steps">
                                                 {/* Single Line Display as requested */}
                                                 <div className="step active">
-                                                    {thinkingSteps[thinkingStep]}
+                                                    {thinkingLabel || thinkingSteps[thinkingStep]}
                                                 </div>
                                             </div>
                                         </div>
@@ -2,10 +2,14 @@ import React, { useEffect, useState, useRef } from 'react';
 import ForceGraph2D from 'react-force-graph-2d';
 import { Loader2 } from 'lucide-react';
 
+// Nodes requested per /api/graph page
+const GRAPH_PAGE_SIZE = 5000;
+
 const GraphView = () => {
     const [data, setData] = useState({ nodes: [], links: [] });
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [precomputedLayout, setPrecomputedLayout] = useState(false);
     const graphRef = useRef();
 
     useEffect(() => {
@@ -14,16 +18,35 @@ const GraphView = () => {
 
     const fetchGraphData = async () => {
         try {
-            const response = await fetch('http://localhost:8000/api/graph');
-            if (!response.ok) {
-                throw new Error('Failed to load graph data');
-            }
-            const graphData = await response.json();
+            // /api/graph is paged; follow next_offset until every node has been fetched.
+            // Pages are appended in order, which is how the server returns each link exactly once.
+            const graphData = { nodes: [], links: [] };
+            let offset = 0;
+            while (offset != null) {
+                const response = await fetch(`http://localhost:8000/api/graph?limit=${GRAPH_PAGE_SIZE}&offset=${offset}`);
+                if (!response.ok) {
+                    throw new Error('Failed to load graph data');
+                }
+                const page = await response.json();
 
-            if (!graphData.nodes || !graphData.links) {
-                throw new Error('Invalid data format');
+                if (!page.nodes || !page.links) {
+                    throw new Error('Invalid data format');
+                }
+                graphData.nodes.push(...page.nodes);
+                graphData.links.push(...page.links);
+                offset = page.next_offset;
             }
 
+            // Server sends precomputed layout coordinates; pin nodes there so the
+            // client does not need to run a force simulation
+            const hasLayout = graphData.nodes.length > 0 && graphData.nodes.every(n => n.x != null && n.y != null);
+            if (hasLayout) {
+                graphData.nodes.forEach(n => {
+                    n.fx = n.x;
+                    n.fy = n.y;
+                });
+            }
+            setPrecomputedLayout(hasLayout);
             setData(graphData);
         } catch (err) {
             console.error(err);
@@ -68,6 +91,7 @@ const GraphView = () => {
             <ForceGraph2D
                 ref={graphRef}
                 graphData={data}
+                cooldownTicks={precomputedLayout ? 0 : Infinity}
                 nodeLabel="description"
                 nodeAutoColorBy="type"
                 backgroundColor="rgba(0,0,0,0)" // Transparent to let container bg show
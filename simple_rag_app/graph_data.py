@@ -0,0 +1,162 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Default page size for /api/graph; limit=0 returns every matching node
+GRAPH_PAGE_LIMIT = 1000
+LINK_LABEL_CHARS = 30
+
+
+def node_degrees(df_entities, graph_index):
+    """Degree per entity row: the indexed 'degree' column, else counted from the adjacency."""
+    if "degree" in df_entities.columns:
+        return df_entities["degree"].fillna(0).to_numpy(dtype=np.int64)
+    return np.diff(graph_index.indptr)[:len(df_entities)]
+
+
+def select_graph(df_entities, df_rels, graph_index, limit=GRAPH_PAGE_LIMIT, offset=0, min_degree=0, types=None, layout=None):
+    """
+    Picks one page of the graph with array operations only.
+
+    Nodes are filtered by type and minimum degree, ordered by degree (highest
+    first) and sliced to [offset, offset + limit). A link is returned when both
+    ends are on this page or an earlier one and at least one end is on this
+    page, so a client appending pages in order ends up with every link exactly once.
+    Relationship endpoints are matched through the GraphIndex node ids rather
+    than by comparing title strings. With a precomputed layout ((n, 2) array
+    per entity row), nodes carry x/y so the client can skip its simulation.
+    Returns (nodes_df, links_df, total_matching_nodes).
+    """
+    degrees = node_degrees(df_entities, graph_index)
+
+    mask = degrees >= min_degree
+    if types:
+        wanted = {t.strip().upper() for t in types if t.strip()}
+        mask &= df_entities["type"].astype(str).str.upper().isin(wanted).to_numpy()
+
+    candidates = np.flatnonzero(mask)
+    # Highest degree first; row order breaks ties so pages are stable
+    candidates = candidates[np.lexsort((candidates, -degrees[candidates]))]
+    total = int(candidates.size)
+
+    end = offset + limit if limit else total
+    page_rows = candidates[offset:end]
+
+    nodes = pd.DataFrame({
+        "id": df_entities["title"].astype(str).to_numpy()[page_rows],  # links refer to entities by title
+        "name": df_entities["title"].to_numpy()[page_rows],
+        "type": df_entities["type"].to_numpy()[page_rows] if "type" in df_entities.columns else "Unknown",
+        "description": df_entities["description"].to_numpy()[page_rows] if "description" in df_entities.columns else "",
+        "degree": degrees[page_rows],
+    })
+    if layout is not None:
+        nodes["x"] = layout[page_rows, 0].round(2)
+        nodes["y"] = layout[page_rows, 1].round(2)
+
+    on_page = np.zeros(graph_index.size, dtype=bool)
+    on_page[page_rows] = True
+    seen = np.zeros(graph_index.size, dtype=bool)
+    seen[candidates[:end]] = True
+    source, target = graph_index.rel_source, graph_index.rel_target
+    link_rows = np.flatnonzero(seen[source] & seen[target] & (on_page[source] | on_page[target]))
+
+    titles = np.asarray(graph_index.titles, dtype=object)
+    if "description" in df_rels.columns:
+        description = df_rels["description"].iloc[link_rows].fillna("").astype(str)
+    else:
+        description = pd.Series([""] * link_rows.size)
+    label = description.str.slice(0, LINK_LABEL_CHARS)
+    label = label.where(description.str.len() <= LINK_LABEL_CHARS, label + "...")
+    links = pd.DataFrame({
+        "source": titles[source[link_rows]],
+        "target": titles[target[link_rows]],
+        "weight": df_rels["weight"].iloc[link_rows].fillna(1.0).astype(float).to_numpy() if "weight" in df_rels.columns else 1.0,
+        "label": label.to_numpy(),
+    })
+    return nodes, links, total
+
+
+def graph_page_json(df_entities, df_rels, graph_index, limit=GRAPH_PAGE_LIMIT, offset=0, min_degree=0, types=None,
+                    index_version=None, layout=None):
+    """/api/graph response body as JSON text, serialized by pandas rather than per-row dicts."""
+    nodes, links, total = select_graph(df_entities, df_rels, graph_index, limit, offset, min_degree, types, layout)
+    end = offset + len(nodes)
+    meta = json.dumps({
+        "total_nodes": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": end if end < total else None,
+        "index_version": index_version,
+    })
+    return (
+        '{"nodes":' + nodes.to_json(orient="records")
+        + ',"links":' + links.to_json(orient="records")
+        + ',' + meta[1:]
+    )
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_BATCH_ROWS = 65536
+ARROW_COMPRESSIONS = ("none", "lz4", "zstd")
+
+
+class _ChunkSink:
+    """Minimal writable file object that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_table(df):
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def arrow_ipc_stream(df, compression="none", batch_rows=ARROW_BATCH_ROWS):
+    """
+    Yields an Arrow IPC stream for a DataFrame, one record batch at a time, so
+    large graphs start transferring before the whole payload exists.
+    """
+    import pyarrow as pa
+
+    table = _arrow_table(df)
+    options = pa.ipc.IpcWriteOptions(compression=None if compression == "none" else compression)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        yield sink.drain()  # schema message
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()  # end-of-stream marker
+
+
+def graph_page_arrow(df_entities, df_rels, graph_index, part, limit=GRAPH_PAGE_LIMIT, offset=0,
+                     min_degree=0, types=None, compression="none", layout=None):
+    """
+    Arrow IPC stream of one graph page's nodes or links, selected exactly like
+    graph_page_json. Returns (byte chunk iterator, total_matching_nodes).
+    """
+    nodes, links, total = select_graph(df_entities, df_rels, graph_index, limit, offset, min_degree, types, layout)
+    df = nodes if part == "nodes" else links
+    # Descriptions can be lists after summarization; Arrow needs one type per column
+    for column in ("description", "label"):
+        if column in df.columns and df[column].dtype == object:
+            df[column] = df[column].astype(str)
+    return arrow_ipc_stream(df, compression), total
@@ -0,0 +1,336 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import threading
+import subprocess
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from agentic_copilot.retrieval.index_versions import resolve_current_version, find_artifacts_dir
+from agentic_copilot.retrieval.incremental_index import build_manifest, plan_reindex, merge_artifacts, save_manifest
+
+# Jobs stage their input concurrently; the graphrag run itself is serialized
+# because every run shares ragtest/input, ragtest/output and ragtest/cache.
+INDEX_JOB_WORKERS = int(os.environ.get("INDEX_JOB_WORKERS", "2"))
+JOB_HISTORY_LIMIT = 50
+JOB_LOG_TAIL_LINES = 40
+
+# Standard GraphRAG indexing pipeline, in execution order
+GRAPHRAG_WORKFLOWS = [
+    "load_input_documents",
+    "create_base_text_units",
+    "create_final_documents",
+    "extract_graph",
+    "finalize_graph",
+    "extract_covariates",
+    "create_communities",
+    "create_final_text_units",
+    "create_community_reports",
+    "generate_text_embeddings",
+]
+_WORKFLOW_RE = re.compile(r"\b(" + "|".join(GRAPHRAG_WORKFLOWS) + r")\b")
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+class JobFailed(Exception):
+    """Raised inside a job to fail it with a user-facing message."""
+
+
+class WorkspaceBusy(Exception):
+    """Raised by IndexJobQueue.idle_workspace() while jobs are queued or running."""
+
+
+class IndexJob:
+    """
+    One ingest + index run. Status moves through
+    queued -> staging -> waiting -> indexing [-> merging] -> publishing -> succeeded | failed.
+    """
+
+    def __init__(self, kind, jobs_dir):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        # Private scratch space: staged input files, plus anything the stage step needs (e.g. a clone)
+        self.work_dir = Path(jobs_dir) / self.id
+        self.staging_dir = self.work_dir / "input"
+        self.status = "queued"
+        self.message = "Queued"
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.files_staged = 0
+        self.files_skipped = 0
+        self.mode = None  # "full", "incremental" or "unchanged", decided when indexing starts
+        self.changes = None
+        self.workflows = OrderedDict((name, {"status": "pending", "seconds": None}) for name in GRAPHRAG_WORKFLOWS)
+        self.log_tail = deque(maxlen=JOB_LOG_TAIL_LINES)
+        self.revision = 0
+        self._workflow_started = {}
+
+    def observe_log_line(self, line):
+        """
+        Tracks workflow progress from a line of graphrag output. A workflow is
+        running from its first mention until a later workflow is mentioned.
+        """
+        self.log_tail.append(line.rstrip())
+        match = _WORKFLOW_RE.search(line)
+        if not match:
+            return False
+        name = match.group(1)
+        if self.workflows[name]["status"] != "pending":
+            return False
+        now = time.time()
+        for earlier, state in self.workflows.items():
+            if earlier == name:
+                break
+            if state["status"] == "running":
+                state["status"] = "completed"
+                state["seconds"] = round(now - self._workflow_started[earlier], 2)
+        self.workflows[name]["status"] = "running"
+        self._workflow_started[name] = now
+        self.message = f"Running {name}"
+        return True
+
+    def finish_workflows(self, stats=None):
+        """Marks the pipeline done, preferring graphrag's own stats.json timings."""
+        now = time.time()
+        stats_workflows = (stats or {}).get("workflows", {})
+        for name, state in self.workflows.items():
+            if name in stats_workflows:
+                state["status"] = "completed"
+                state["seconds"] = round(stats_workflows[name].get("overall", 0.0), 2)
+            elif state["status"] == "running":
+                state["status"] = "completed"
+                state["seconds"] = round(now - self._workflow_started[name], 2)
+            elif state["status"] == "pending":
+                state["status"] = "skipped"
+
+    def to_dict(self):
+        done = sum(1 for s in self.workflows.values() if s["status"] in ("completed", "skipped"))
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round((self.finished_at or time.time()) - (self.started_at or self.created_at), 2),
+            "files_staged": self.files_staged,
+            "files_skipped": self.files_skipped,
+            "mode": self.mode,
+            "changes": self.changes,
+            "progress": round(done / len(self.workflows), 3),
+            "workflows": [{"name": name, **state} for name, state in self.workflows.items()],
+            "log_tail": list(self.log_tail),
+            "revision": self.revision,
+        }
+
+
+class IndexJobQueue:
+    """
+    Runs ingest jobs on a bounded thread pool so HTTP handlers return immediately.
+
+    Each job stages its files into its own directory, so concurrent submissions
+    never clobber each other. The graphrag run is serialized: when a job's turn
+    comes its staged files are moved into the shared input directory and indexed.
+    `on_success` runs after a successful index, still holding the workspace.
+    """
+
+    def __init__(self, base_dir, rag_root, input_dir, on_success, workers=INDEX_JOB_WORKERS):
+        self.base_dir = Path(base_dir)
+        self.rag_root = Path(rag_root)
+        self.input_dir = Path(input_dir)
+        self.jobs_dir = self.rag_root / "jobs"
+        self.on_success = on_success
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index-job")
+        self._workspace_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def create_job(self, kind):
+        """Registers a job and creates its private staging directory."""
+        job = IndexJob(kind, self.jobs_dir)
+        job.staging_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def discard(self, job):
+        """Drops a job that never started (e.g. nothing valid was uploaded)."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def start(self, job, stage=None):
+        """
+        Queues the job. `stage(job)` runs first on the worker (e.g. clone + filter
+        files into job.staging_dir) and returns the number of files staged.
+        """
+        self._executor.submit(self._run, job, stage)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    @contextmanager
+    def idle_workspace(self):
+        """
+        Holds the shared workspace for maintenance such as a reset. Raises
+        WorkspaceBusy instead of waiting when any job has not finished yet; jobs
+        submitted meanwhile wait for the workspace before they index.
+        """
+        with self._lock:
+            active = [job.id for job in self._jobs.values() if job.status not in FINISHED_STATUSES]
+        if active or not self._workspace_lock.acquire(blocking=False):
+            raise WorkspaceBusy(f"Indexing jobs still running: {', '.join(active) or 'unknown'}")
+        try:
+            yield
+        finally:
+            self._workspace_lock.release()
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in FINISHED_STATUSES]
+        for job in finished[:max(len(self._jobs) - JOB_HISTORY_LIMIT, 0)]:
+            del self._jobs[job.id]
+
+    def _update(self, job, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.revision += 1
+
+    def _run(self, job, stage):
+        self._update(job, started_at=time.time())
+        try:
+            if stage is not None:
+                self._update(job, status="staging", message="Staging files")
+                count = stage(job)
+                self._update(job, files_staged=count)
+            if not job.files_staged:
+                raise JobFailed("No valid code files found to index.")
+
+            self._update(job, status="waiting", message="Waiting for the indexer")
+            with self._workspace_lock:
+                message = self._index(job)
+            self._update(job, status="succeeded", message=message, finished_at=time.time())
+            print(f"✅ Index job {job.id} finished in {job.finished_at - job.started_at:.1f}s")
+        except Exception as e:
+            if not isinstance(e, JobFailed):
+                import traceback
+                traceback.print_exc()
+            self._update(job, status="failed", message="Indexing failed", error=str(e), finished_at=time.time())
+            print(f"❌ Index job {job.id} failed: {e}")
+        finally:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def _index(self, job):
+        """
+        Indexes the staged files, holding the workspace. Files are diffed against
+        the manifest of the current index version: an unchanged input set is not
+        re-indexed, and a small change only runs graphrag over the added / changed
+        files and merges the result into the previous artifacts.
+        """
+        previous_dir = resolve_current_version()
+        manifest = build_manifest(job.staging_dir)
+        mode, diff = plan_reindex(previous_dir, manifest)
+        self._update(job, mode=mode, changes=diff.summary() if diff else None)
+        if mode == "unchanged":
+            with self._lock:
+                job.finish_workflows()
+            return "No changes since the current index version"
+
+        output_root = self.rag_root / "output"
+        if mode == "incremental":
+            to_index = set(diff.to_index)
+            for entry in os.scandir(job.staging_dir):
+                if entry.name not in to_index:
+                    os.unlink(entry.path)
+            # The delta run's output must not be mixed with leftovers of earlier runs
+            shutil.rmtree(output_root, ignore_errors=True)
+        self._swap_input(job)
+
+        if mode == "incremental" and not diff.to_index:
+            # Files were only removed: nothing to extract, just drop them from the artifacts
+            with self._lock:
+                job.finish_workflows()
+            delta_dir = None
+        else:
+            self._update(job, status="indexing", message="Running GraphRAG indexing")
+            self._run_graphrag(job)
+            delta_dir = find_artifacts_dir(output_root)
+
+        if mode == "incremental":
+            self._update(job, status="merging", message="Merging changes into the current index")
+            merge_artifacts(previous_dir, delta_dir, diff, delta_dir or str(output_root))
+        artifacts_dir = find_artifacts_dir(output_root)
+        if artifacts_dir is not None:
+            save_manifest(artifacts_dir, manifest)
+
+        self._update(job, status="publishing", message="Publishing index version")
+        self.on_success()
+        if mode == "incremental":
+            return f"Updated the index incrementally ({diff.summary()})"
+        return f"Indexed {job.files_staged} files"
+
+    def _swap_input(self, job):
+        """Replaces the shared input directory with this job's staged files."""
+        print(f"🧹 Replacing {self.input_dir} with staged files of job {job.id}...")
+        if self.input_dir.exists():
+            shutil.rmtree(self.input_dir)
+        self.input_dir.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(job.staging_dir, self.input_dir)
+
+    def _run_graphrag(self, job):
+        print(f"Running Indexing for job {job.id}...")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "graphrag", "index", "--root", str(self.rag_root.name)],
+            cwd=str(self.base_dir),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        output = []
+        for line in process.stdout:
+            output.append(line)
+            with self._lock:
+                job.observe_log_line(line)
+                job.revision += 1
+        returncode = process.wait()
+
+        stdout = "".join(output)
+        if returncode != 0:
+            # Relaxed Check: GraphRAG sometimes emits RuntimeWarnings at exit but finishes work
+            if "Pipeline complete" in stdout:
+                print(f"⚠️ Indexing generated warnings but completed successfully (job {job.id}).")
+            else:
+                print(f"❌ Indexing Failed with return code {returncode}\nOUTPUT:\n{stdout[-4000:]}")
+                raise JobFailed(f"Indexing failed. Return Code: {returncode}. Output: {stdout[-500:]}")
+
+        with self._lock:
+            job.finish_workflows(self._read_stats())
+            job.revision += 1
+
+    def _read_stats(self):
+        path = self.rag_root / "output" / "stats.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
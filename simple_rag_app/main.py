@@ -1,13 +1,21 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-import subprocess
 import os
+import asyncio
+from contextlib import asynccontextmanager
+import json
+import time
 import shutil
 import sys
+import hashlib
+import tarfile
+import zipfile
 from pathlib import Path
-from .utils import clone_repo, process_files
+from .utils import clone_repo, process_files, save_text_upload, extract_code_files
+from .graph_data import graph_page_json, graph_page_arrow, GRAPH_PAGE_LIMIT, ARROW_COMPRESSIONS, ARROW_STREAM_MEDIA_TYPE
 
 # Add project root to path to import agentic_copilot
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -19,9 +27,26 @@ key_status = "FOUND" if os.environ.get("OPENAI_API_KEY") else "MISSING"
 print(f"DEBUG: OPENAI_API_KEY status: {key_status}")
 
 
-from agentic_copilot.graphs.main_graph import create_main_graph
+from agentic_copilot.graphs.main_graph import get_main_graph, get_graph_compile_stats
+from agentic_copilot.retrieval.artifact_store import get_artifact_store
+from agentic_copilot.cache.answer_cache import get_answer_cache
+from agentic_copilot.graphs.graphrag_subgraph import get_latest_output_dir, is_error_context
+from agentic_copilot.retrieval.bm25 import get_bm25_retriever
+from agentic_copilot.retrieval.vector_store import get_vector_retriever, find_lancedb_uri
+from agentic_copilot.retrieval.graph_index import get_graph_index
+from agentic_copilot.retrieval.graph_layout import get_graph_layout
+from agentic_copilot.retrieval.index_versions import publish_version, find_artifacts_dir, clear_versions
+from agentic_copilot.cache.lru_cache import PersistentLRUCache, make_key
+from .jobs import IndexJobQueue, JobFailed, WorkspaceBusy, FINISHED_STATUSES
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the LangGraph application once, off the request path
+    get_main_graph()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -35,23 +60,72 @@ app.add_middleware(
 BASE_DIR = Path(os.getcwd())
 RAG_TEST_DIR = BASE_DIR / "ragtest"
 INPUT_DIR = RAG_TEST_DIR / "input"
-TEMP_REPO_DIR = BASE_DIR / "temp_repo"
+STAGING_CACHE_DIR = RAG_TEST_DIR / "staging_cache"
+# Uploaded files saved to disk concurrently
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", "8"))
+UPLOAD_MAX_FILES = int(os.environ.get("UPLOAD_MAX_FILES", "20000"))
+
+# Serialized /api/graph pages keyed by ETag; very large pages are not kept
+GRAPH_RESPONSE_CACHE_MAX_CHARS = 8 * 1024 * 1024
+_graph_responses = PersistentLRUCache(max_entries=32, ttl_seconds=None)
+
+# Background ingest/indexing jobs, created on first use
+_index_jobs = None
+
+
+def on_index_updated():
+    """Called after a successful indexing run."""
+    # Publish the finished run as a new immutable version and flip the current pointer;
+    # queries keep reading the previous version until this returns
+    artifacts_dir = find_artifacts_dir(RAG_TEST_DIR / "output")
+    if artifacts_dir is None:
+        print("⚠️  Indexing finished but no artifacts were found to publish")
+        return
+    # The version gets its own copy of the embeddings: the next run rewrites output/lancedb in place
+    lancedb_dir = find_lancedb_uri(artifacts_dir) or find_lancedb_uri(str(RAG_TEST_DIR / "output"))
+    output_dir = publish_version(artifacts_dir, lancedb_dir=lancedb_dir)
+    # Drop in-memory tables of the previous and pruned versions; new artifacts -> cached answers are stale
+    get_artifact_store().retain(output_dir)
+    get_answer_cache().clear()
+    # Build the retrieval indexes and open the vector tables now rather than on the first query
+    get_bm25_retriever(output_dir)
+    get_graph_index(output_dir)
+    get_vector_retriever(output_dir)
+    # Graph view layout, computed once per index version and saved with the artifacts
+    get_graph_layout(output_dir)
+
+
+def _index_job_queue():
+    global _index_jobs
+    if _index_jobs is None:
+        _index_jobs = IndexJobQueue(BASE_DIR, RAG_TEST_DIR, INPUT_DIR, on_success=on_index_updated)
+    return _index_jobs
+
+
+def _job_accepted(job, message):
+    return JSONResponse(
+        status_code=202,
+        content={"status": "queued", "job_id": job.id, "message": message, "status_url": f"/api/jobs/{job.id}"},
+    )
 
 
 @app.post("/api/ingest/upload")
-async def ingest_files(files: list[UploadFile] = File(...)):
+async def ingest_files(request: Request):
+    """Stages the uploaded files and queues an indexing job; returns 202 with its job_id."""
+    # Form parsed here rather than with File(...) to lift Starlette's default 1000-file limit
+    async with request.form(max_files=UPLOAD_MAX_FILES, max_fields=UPLOAD_MAX_FILES) as form:
+        files = [f for f in form.getlist("files") if not isinstance(f, str)]
+        if not files:
+            raise HTTPException(status_code=400, detail="No files uploaded.")
+        return await _stage_uploads(files)
+
+async def _stage_uploads(files):
+    job = None
     try:
-        # 1. Clear Input Directory (Start Fresh)
-        if INPUT_DIR.exists():
-            print(f"🧹 Clearing existing data in {INPUT_DIR}...")
-            for item in INPUT_DIR.iterdir():
-                if item.is_dir():
-                    shutil.rmtree(item)
-                else:
-                    item.unlink()
-        else:
-            INPUT_DIR.mkdir(parents=True, exist_ok=True)
-            
+        # Each job stages into its own directory; the shared input dir is only replaced when indexing starts
+        job = _index_job_queue().create_job("upload")
+        staging_dir = job.staging_dir
+
         # Define filters (Hardcoded for Salesforce & General Code)
         ALLOWED_EXTENSIONS = {
             # Salesforce
@@ -71,8 +145,8 @@ async def ingest_files(files: list[UploadFile] = File(...)):
 
         print(f"🎯 using Hardcoded Filters | Allowed: {len(ALLOWED_EXTENSIONS)} types, Ignored: {len(IGNORED_PATTERNS)} patterns")
 
-        count = 0
         skipped_count = 0
+        accepted = {}
         
         for file in files:
             filename = file.filename
@@ -96,52 +170,55 @@ async def ingest_files(files: list[UploadFile] = File(...)):
                 skipped_count += 1
                 continue
 
-            # Save file
-            target_path = INPUT_DIR / file_path.name
-            
-            content = await file.read()
-            # Basic textual check
-            try:
-                text_content = content.decode("utf-8")
-                with open(target_path, "w", encoding="utf-8") as f:
-                    f.write(text_content)
-                count += 1
-            except UnicodeDecodeError:
-                print(f"Skipping binary file: {filename}")
+            # Files are saved by name only; the first upload with a given name is kept
+            if file_path.name in accepted:
+                print(f"Skipping duplicate file name: {filename} (keeping {accepted[file_path.name].filename})")
+                skipped_count += 1
+                continue
+            accepted[file_path.name] = file
+
+        # Save files: streamed to disk in chunks, several at a time, off the event loop
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+        async def save(name, file):
+            async with semaphore:
+                return await asyncio.to_thread(save_text_upload, file.file, staging_dir / name)
+
+        results = await asyncio.gather(*(save(name, file) for name, file in accepted.items()))
+        count = 0
+        total_bytes = 0
+        for file, size in zip(accepted.values(), results):
+            if size is None:
+                # Basic textual check
+                print(f"Skipping binary file: {file.filename}")
                 skipped_count += 1
                 continue
+            count += 1
+            total_bytes += size
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"📦 Saved {count} uploads ({total_bytes / (1024 * 1024):.1f} MB) in {elapsed:.2f}s: "
+              f"{count / elapsed:.0f} files/s, {total_bytes / (1024 * 1024) / elapsed:.1f} MB/s")
 
         if count == 0:
-             raise HTTPException(status_code=400, detail=f"No valid code files found! Checked {len(files)} files.")
+            _index_job_queue().discard(job)
+            raise HTTPException(status_code=400, detail=f"No valid code files found! Checked {len(files)} files.")
 
-        print(f"Uploaded {count} valid files to {INPUT_DIR} (Skipped {skipped_count})")
-        
-        # 3. Run GraphRAG Indexing
-        print("Running Indexing...")
-        result = subprocess.run(
-            [sys.executable, "-m", "graphrag", "index", "--root", "ragtest"],
-            cwd=str(BASE_DIR),
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            # Relaxed Check: GraphRAG sometimes emits RuntimeWarnings at exit but finishes work
-            if "Pipeline complete" in result.stdout:
-                print(f"⚠️ Indexing generated warnings but completed successfully.\nWarnings: {result.stderr[:200]}...")
-            else:
-                print(f"❌ Indexing Failed with return code {result.returncode}")
-                print(f"STDOUT:\n{result.stdout}")
-                print(f"STDERR:\n{result.stderr}")
-                raise HTTPException(status_code=500, detail=f"Indexing failed. Check server logs for details. Stderr: {result.stderr[:500]}...")
-            
-        success_msg = f"Successfully uploaded {count} files (Skipped {skipped_count} noise files)."
-        return {"status": "success", "message": success_msg}
+        print(f"Staged {count} valid files for job {job.id} (Skipped {skipped_count})")
+        job.files_staged = count
+        job.files_skipped = skipped_count
 
+        # 3. Run GraphRAG Indexing in the background
+        _index_job_queue().start(job)
+        return _job_accepted(job, f"Uploaded {count} files (Skipped {skipped_count} noise files). Indexing queued.")
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
+        if job is not None:
+            _index_job_queue().discard(job)
         raise HTTPException(status_code=500, detail=str(e))
 
 from typing import Optional
@@ -153,183 +230,430 @@ class IngestRequest(BaseModel):
 class QueryRequest(BaseModel):
     query: str
 
+def staging_cache_dir(source):
+    """Per-source cache of staged files, so re-ingesting a source only rewrites what changed."""
+    return STAGING_CACHE_DIR / hashlib.sha1(source.strip().encode("utf-8")).hexdigest()[:16]
+
+def _stage_repo(repo_url, local_path):
+    """Job stage step for /api/ingest: clone (or read the local path) and filter into the job's staging dir."""
+    def stage(job):
+        try:
+            if local_path:
+                source_dir = local_path
+            else:
+                print(f"Cloning {repo_url}...")
+                source_dir = str(clone_repo(repo_url, str(job.work_dir / "repo")))
+
+            print(f"Processing files from {source_dir}...")
+            return process_files(source_dir, str(job.staging_dir), cache_dir=str(staging_cache_dir(local_path or repo_url)))
+        except FileNotFoundError as e:
+            raise JobFailed(f"System command not found: {str(e)}")
+        except Exception as e:
+            error_msg = str(e)
+            if "404" in error_msg or "Not Found" in error_msg:
+                raise JobFailed("Repository not found or private. Please check the URL. If private, set GITHUB_TOKEN in your .env file.")
+            raise
+    return stage
+
 @app.post("/api/ingest")
 async def ingest_repo(request: IngestRequest):
+    """Queues clone/copy + indexing of a repository; returns 202 with the job_id to poll."""
     repo_url = request.repo_url
     local_path = request.local_path
     
     # Validation: Ensure at least one is provided
     if not repo_url and not local_path:
         raise HTTPException(status_code=400, detail="Either 'repo_url' or 'local_path' must be provided.")
-        
-    try:
-        source_dir = ""
-        
-        # 1. Determine Source
-        if local_path:
-            # Handle Local Path
-            print(f"Ingesting from local path: {local_path}...")
-            p = Path(local_path)
-            if not p.exists() or not p.is_dir():
-                raise HTTPException(status_code=400, detail=f"Local path does not exist or is not a directory: {local_path}")
-            source_dir = str(p)
-        else:
-            # Handle GitHub URL
-            print(f"Cloning {repo_url}...")
-            source_dir = str(clone_repo(repo_url, str(TEMP_REPO_DIR)))
-        
-        # 2. Process Files
-        print(f"Processing files from {source_dir}...")
-        count = process_files(source_dir, str(INPUT_DIR))
-        
-        # 3. Run GraphRAG Indexing
-        # Note: This is a blocking operation and can take time.
-        print("Running Indexing...")
-        result = subprocess.run(
-            [sys.executable, "-m", "graphrag", "index", "--root", "ragtest"],
-            cwd=str(BASE_DIR),
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print(f"STDOUT: {result.stdout}")
-            print(f"STDERR: {result.stderr}")
-            raise HTTPException(status_code=500, detail=f"Indexing failed. Return Code: {result.returncode}. Output: {result.stdout} \n Errors: {result.stderr}")
-            
-        return {"status": "success", "message": f"Successfully ingested {count} files and indexed the graph."}
 
-    except HTTPException as he:
-        raise he
-    except FileNotFoundError as e:
+    if local_path:
+        # Handle Local Path
+        print(f"Ingesting from local path: {local_path}...")
+        p = Path(local_path)
+        if not p.exists() or not p.is_dir():
+            raise HTTPException(status_code=400, detail=f"Local path does not exist or is not a directory: {local_path}")
+        local_path = str(p)
+
+    try:
+        queue = _index_job_queue()
+        job = queue.start(queue.create_job("repo"), stage=_stage_repo(repo_url, local_path))
+        return _job_accepted(job, f"Ingestion of {local_path or repo_url} queued.")
+    except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"System command not found: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+
+@app.post("/api/ingest/archive")
+async def ingest_archive(archive: UploadFile = File(...)):
+    """
+    Ingests one zip / tar(.gz|.bz2|.xz) archive of a source tree instead of one
+    multipart part per file. Only code files are extracted; staging and
+    indexing then run as a background job. Returns 202 with the job_id.
+    """
+    queue = _index_job_queue()
+    job = queue.create_job("archive")
+    source_dir = job.work_dir / "source"
+    try:
+        # The upload is already spooled by the multipart parser; extract straight from it
+        extracted, skipped = await asyncio.to_thread(extract_code_files, archive.file, str(source_dir))
+    except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+        queue.discard(job)
+        raise HTTPException(status_code=400, detail=f"Could not read archive {archive.filename}: {e}")
     except Exception as e:
         import traceback
         traceback.print_exc()
-        error_msg = str(e)
-        if "404" in error_msg or "Not Found" in error_msg:
-             raise HTTPException(
-                 status_code=400, 
-                 detail="Repository not found or private. Please check the URL. If private, set GITHUB_TOKEN in your .env file."
-             )
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {error_msg}")
+        queue.discard(job)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if extracted == 0:
+        queue.discard(job)
+        raise HTTPException(status_code=400, detail=f"No valid code files found in {archive.filename}! Checked {skipped} entries.")
+
+    job.files_skipped = skipped
+
+    def stage(job):
+        # Archives of a repo usually hold one top-level folder (e.g. repo-main/); stage from inside it
+        entries = list(source_dir.iterdir())
+        root = entries[0] if len(entries) == 1 and entries[0].is_dir() else source_dir
+        print(f"Processing files from {archive.filename}...")
+        return process_files(str(root), str(job.staging_dir), cache_dir=str(staging_cache_dir(f"archive:{archive.filename}")))
+
+    queue.start(job, stage=stage)
+    return _job_accepted(job, f"Extracted {extracted} code files from {archive.filename} (Skipped {skipped} entries). Indexing queued.")
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """Recent indexing jobs, newest first."""
+    jobs = _index_job_queue().list()
+    return {"jobs": [job.to_dict() for job in reversed(jobs)]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, overall progress and per-workflow timings of one indexing job."""
+    job = _index_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+# How often the job event stream checks for changes
+JOB_EVENTS_POLL_SECONDS = 0.5
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent events for one indexing job:
+      event: progress  -> job status whenever it changes (same shape as /api/jobs/{job_id})
+      event: done      -> final status once the job succeeded or failed
+    """
+    job = _index_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+
+    async def event_stream():
+        last_revision = -1
+        while True:
+            finished = job.status in FINISHED_STATUSES
+            if job.revision != last_revision or finished:
+                payload = job.to_dict()
+                last_revision = payload["revision"]
+                yield sse_event("done" if finished else "progress", payload)
+            if finished:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/api/reset")
-async def reset_data():
+def reset_data():
+    """Clears all ingested data; 409 while an indexing job is still queued or running."""
     try:
-        # Clear Input Directory
-        if INPUT_DIR.exists():
-            for file in INPUT_DIR.glob("*"):
-                if file.is_file():
-                    file.unlink()
-        
-        # Clear Output Directory
-        output_dir = BASE_DIR / "ragtest" / "output"
-        if output_dir.exists():
-            shutil.rmtree(output_dir)
+        with _index_job_queue().idle_workspace():
+            # Clear Input Directory
+            if INPUT_DIR.exists():
+                for file in INPUT_DIR.glob("*"):
+                    if file.is_file():
+                        file.unlink()
+            
+            # Clear Output Directory
+            output_dir = BASE_DIR / "ragtest" / "output"
+            if output_dir.exists():
+                shutil.rmtree(output_dir)
+            clear_versions()
+            shutil.rmtree(STAGING_CACHE_DIR, ignore_errors=True)
+            
+            get_answer_cache().clear()
+            get_artifact_store().invalidate()
             
         return {"status": "success", "message": "All data cleared successfully."}
+    except WorkspaceBusy as e:
+        raise HTTPException(status_code=409, detail=f"Cannot reset while indexing: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_initial_state(query: str):
+    return {
+        "user_query": query,
+        "rag_context": [],
+        "graphrag_context": [],
+        "tool_results": [],
+        "risk_signals": [],
+        "merged_insights": []
+    }
+
+# Routing summary returned (and cached) with each answer; raw retrieval contexts are not
+ANSWER_DETAIL_FIELDS = ("intent", "search_method", "context_budget")
+
+def answer_cache_entry(final_answer, state):
+    details = {key: state.get(key) for key in ANSWER_DETAIL_FIELDS if state.get(key) is not None}
+    return {"response": final_answer, "details": details}
+
+def cacheable_answer(state):
+    """Answers built while a retrieval branch failed are not cached for the index version."""
+    contexts = list(state.get("graphrag_context") or []) + list(state.get("rag_context") or [])
+    return not any(is_error_context(c) for c in contexts)
+
 @app.post("/api/query")
 async def query_graph(request: QueryRequest):
     try:
         print(f"Agentic Query: {request.query}")
         
-        # Initialize the LangGraph Application
-        # We create it per request or cache it globally. Creating per request is safer for thread isolation in this prototype.
-        graph_app = create_main_graph()
+        # Serve repeated questions against the same index from the answer cache
+        answer_cache = get_answer_cache()
+        output_dir = get_latest_output_dir()
+        index_version = get_artifact_store().index_version(output_dir) if output_dir else None
+        cached = answer_cache.get(request.query, index_version)
+        if cached is not None:
+            print(f"⚡ Answer cache hit (index {index_version})")
+            return {**cached, "cached": True}
+        
+        # Shared compiled LangGraph Application (built once at startup)
+        # Each invocation gets its own state, so concurrent requests stay isolated.
+        graph_app = get_main_graph()
         
         # Initial State
-        initial_state = {
-            "user_query": request.query,
-            "rag_context": [],
-            "graphrag_context": [],
-            "tool_results": [],
-            "risk_signals": [],
-            "merged_insights": []
-        }
+        initial_state = build_initial_state(request.query)
         
         # Execute Graph
-        # We use .invoke() for a blocking call suitable for a standard HTTP request
-        result = graph_app.invoke(initial_state)
+        # .ainvoke() keeps the event loop free: nodes await async LLM clients and searches
+        result = await graph_app.ainvoke(initial_state)
         
         final_answer = result.get("final_answer", "No answer generated by agents.")
         
-        # We can also return the detailed trace if the frontend supports it, 
-        # but for "same React UI" compatibility, we primarily return 'response'.
-        # We append the details to the response or a separate field.
+        # For "same React UI" compatibility, we primarily return 'response'.
+        response = answer_cache_entry(final_answer, result)
+        if cacheable_answer(result):
+            answer_cache.set(request.query, index_version, response)
         
-        return {
-            "response": final_answer,
-            "details": result # Extra data for potential future UI upgrades
-        }
+        return response
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# Top-level LangGraph nodes reported as progress events on the streaming endpoint
+STREAM_PROGRESS_NODES = {"intent_analyzer", "graphrag_agent", "final_reasoner"}
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _progress_payload(node: str, output, started: float):
+    payload = {"node": node, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if isinstance(output, dict):
+        for key in ("intent", "search_method"):
+            if output.get(key):
+                payload[key] = output[key]
+        if node == "graphrag_agent":
+            payload["context_items"] = len(output.get("graphrag_context") or [])
+    return payload
+
+@app.post("/api/query/stream")
+async def query_graph_stream(request: QueryRequest):
+    """
+    Server-sent events version of /api/query:
+      event: progress  -> after each pipeline stage (intent, retrieval/search, final)
+      event: token     -> answer tokens as the final reasoner generates them
+      event: done      -> full answer (same shape as /api/query's "response")
+      event: error     -> pipeline failure
+    """
+    print(f"Agentic Query (stream): {request.query}")
+
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            answer_cache = get_answer_cache()
+            output_dir = get_latest_output_dir()
+            index_version = get_artifact_store().index_version(output_dir) if output_dir else None
+            cached = answer_cache.get(request.query, index_version)
+            if cached is not None:
+                print(f"⚡ Answer cache hit (index {index_version})")
+                yield sse_event("token", {"text": cached["response"]})
+                yield sse_event("done", {"response": cached["response"], "cached": True})
+                return
+
+            final_state = None
+            streamed_tokens = False
+            async for event in get_main_graph().astream_events(build_initial_state(request.query), version="v2"):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chat_model_stream" and node == "final_reasoner":
+                    text = event["data"]["chunk"].content
+                    if text:
+                        streamed_tokens = True
+                        yield sse_event("token", {"text": text})
+
+                elif kind == "on_chain_end" and event["name"] in STREAM_PROGRESS_NODES and node == event["name"]:
+                    yield sse_event("progress", _progress_payload(event["name"], event["data"].get("output"), started))
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    final_state = event["data"].get("output")
+
+            final_state = final_state or {}
+            final_answer = final_state.get("final_answer", "No answer generated by agents.")
+            if not streamed_tokens:
+                yield sse_event("token", {"text": final_answer})
+
+            if cacheable_answer(final_state):
+                answer_cache.set(request.query, index_version, answer_cache_entry(final_answer, final_state))
+            yield sse_event("done", {"response": final_answer, "cached": False})
+
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    from agentic_copilot.agents.query_router import get_router_cache
+    return {
+        "router": get_router_cache().stats(),
+        "answers": get_answer_cache().stats(),
+        "artifacts": get_artifact_store().stats(),
+    }
+
+@app.get("/api/metrics")
+async def metrics():
+    return {"graph_compile": get_graph_compile_stats()}
+
+def graph_etag(index_version, *params):
+    """Strong ETag for a graph response: same index version + same query -> same bytes."""
+    return '"' + make_key("graph", index_version, *params)[:32] + '"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+# The graph endpoints are plain `def` so Starlette runs them in its threadpool: loading
+# parquet, building the GraphIndex and the layout would otherwise block the event loop
 @app.get("/api/graph")
-async def get_graph():
+def get_graph(
+    request: Request,
+    limit: int = GRAPH_PAGE_LIMIT,
+    offset: int = 0,
+    min_degree: int = 0,
+    type: Optional[str] = None,
+):
+    """
+    One page of the knowledge graph, highest-degree nodes first, with precomputed x/y.
+    `type` is a comma-separated list of entity types; limit=0 returns all matching nodes.
+    """
+    if limit < 0 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit and offset must be non-negative")
     try:
-        import pandas as pd
+        output_dir = get_latest_output_dir()
         
-        output_dir = RAG_TEST_DIR / "output"
-        # Find the timestamped folder or just use the latest artifacts if they are in root of output 
-        # (GraphRAG default behavior might vary, but usually they are right in output/YYYYMMDD-HHMMSS/artifacts)
-        # However, our previous run showed they were directly in output/ or a subdir. 
-        # Let's check where the previous run put them.
+        store = get_artifact_store()
+        df_entities = store.get_table(output_dir, "entities") if output_dir else None
+        df_rels = store.get_table(output_dir, "relationships") if output_dir else None
         
-        # Based on previous `list_dir` calls, artifacts seem to be directly in `ragtest/output` 
-        # OR `ragtest/output/lancedb` etc.
-        # Wait, the `list_dir` showed text_units.parquet etc in `ragtest/output`.
-        
-        entities_path = output_dir / "entities.parquet"
-        relationships_path = output_dir / "relationships.parquet"
-        
-        if not entities_path.exists() or not relationships_path.exists():
+        if df_entities is None or df_rels is None:
              # Return empty graph instead of error to allow UI to load gracefully
              return {"nodes": [], "links": []}
 
-        # Read Entities
-        df_entities = pd.read_parquet(entities_path)
-        # Columns usually: id, title, type, description, ...
-        # Take top nodes by degree or just first N to avoid overwhelming UI
-        # For simplicity, let's take all or top 500.
-        nodes = []
-        for _, row in df_entities.iterrows():
-            # CRITICAL FIX: Links use Entity Names (titles) as source/target, not UUIDs.
-            # So we must use the title as the ID for the frontend graph to connect them.
-            nodes.append({
-                "id": str(row.get('title', 'Unknown')),  # Use Title as ID
-                "name": row.get('title', 'Unknown'),
-                "type": row.get('type', 'Unknown'),
-                "description": row.get('description', '')
-            })
-            
-        # Read Relationships
-        df_rels = pd.read_parquet(relationships_path)
-        # Columns: source, target, weight, description...
-        links = []
-        for _, row in df_rels.iterrows():
-            # Get description for label, truncate if too long
-            desc = str(row.get('description', ''))
-            # Simple heuristic: first few words or truncated string
-            label = (desc[:30] + '...') if len(desc) > 30 else desc
-            
-            links.append({
-                "source": str(row.get('source', '')),
-                "target": str(row.get('target', '')),
-                "weight": float(row.get('weight', 1.0)),
-                "label": label
-            })
-            
-        return {"nodes": nodes, "links": links}
+        types = [t for t in type.split(",") if t.strip()] if type else None
+        index_version = store.index_version(output_dir)
+        etag = graph_etag(index_version, limit, offset, min_degree, sorted(types or []))
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        body = _graph_responses.get(etag)
+        if body is None:
+            graph_index = get_graph_index(output_dir)
+            body = graph_page_json(
+                df_entities, df_rels, graph_index, limit, offset, min_degree, types,
+                index_version, get_graph_layout(output_dir),
+            )
+            if len(body) <= GRAPH_RESPONSE_CACHE_MAX_CHARS:
+                _graph_responses.set(etag, body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    except ImportError:
+        raise HTTPException(status_code=500, detail="Pandas/Pyarrow not installed on backend.")
+    except Exception as e:
+        print(f"Graph Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/graph/arrow/{part}")
+def get_graph_arrow(
+    part: str,
+    request: Request,
+    limit: int = GRAPH_PAGE_LIMIT,
+    offset: int = 0,
+    min_degree: int = 0,
+    type: Optional[str] = None,
+    compression: str = "none",
+):
+    """
+    Same page as /api/graph, as an Arrow IPC stream of either the nodes or the links.
+    `compression` is none, lz4 or zstd (Arrow buffer compression).
+    """
+    if part not in ("nodes", "links"):
+        raise HTTPException(status_code=404, detail="part must be 'nodes' or 'links'")
+    if limit < 0 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit and offset must be non-negative")
+    if compression not in ARROW_COMPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"compression must be one of {', '.join(ARROW_COMPRESSIONS)}")
+    try:
+        import pyarrow as pa
+        if compression != "none" and not pa.Codec.is_available(compression):
+            raise HTTPException(status_code=400, detail=f"{compression} compression is not available on this server")
+
+        output_dir = get_latest_output_dir()
+        store = get_artifact_store()
+        df_entities = store.get_table(output_dir, "entities") if output_dir else None
+        df_rels = store.get_table(output_dir, "relationships") if output_dir else None
+        if df_entities is None or df_rels is None:
+            raise HTTPException(status_code=404, detail="No graph artifacts found. Please run indexing first.")
+
+        types = [t for t in type.split(",") if t.strip()] if type else None
+        index_version = store.index_version(output_dir)
+        etag = graph_etag(index_version, "arrow", part, limit, offset, min_degree, sorted(types or []), compression)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Index-Version": index_version}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        chunks, total = graph_page_arrow(
+            df_entities, df_rels, get_graph_index(output_dir), part,
+            limit, offset, min_degree, types, compression, get_graph_layout(output_dir),
+        )
+        headers["X-Total-Nodes"] = str(total)
+        return StreamingResponse(chunks, media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
 
+    except HTTPException:
+        raise
     except ImportError:
         raise HTTPException(status_code=500, detail="Pandas/Pyarrow not installed on backend.")
     except Exception as e:
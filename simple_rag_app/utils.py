@@ -1,9 +1,17 @@
 import os
+import stat
 import shutil
 import subprocess
 import urllib.request
 import zipfile
-import io
+import tarfile
+import tempfile
+import json
+import codecs
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def get_git_command():
@@ -53,8 +61,8 @@ def download_zip_repo(repo_url: str, target_dir: str, branch: str = "main"):
         try:
             req = urllib.request.Request(zip_url, headers=headers)
             with urllib.request.urlopen(req) as response:
-                with zipfile.ZipFile(io.BytesIO(response.read())) as z:
-                    z.extractall(target_dir)
+                with spool_stream(response) as archive:
+                    extract_code_files(archive, target_dir)
                     
             print(f"Successfully downloaded token from {current_branch}")
             
@@ -130,11 +138,129 @@ def clone_repo(repo_url: str, target_dir: str):
     full_path = Path(extracted_root) / subpath if subpath else Path(extracted_root)
     return str(full_path)
 
-def process_files(source_dir: str, dest_dir: str):
+# Parallel staging: files are read, wrapped and written by a bounded thread pool
+STAGING_WORKERS = int(os.environ.get("STAGING_WORKERS", str(min(32, (os.cpu_count() or 1) * 4))))
+STAGING_STATE_FILE = "state.json"
+
+# Directories skipped while walking a source tree
+IGNORE_DIRS = {
+    '.git', '.idea', '.vscode', '__pycache__', 'node_modules', 
+    'dist', 'build', 'coverage', 'venv', 'env', 'bin', 'obj', 
+    'target', 'out', 'assets', 'images', 'media', 'test', 'tests'
+}
+
+# Strict Code Only - Removed JSON/YAML to avoid data bloating
+ALLOWED_EXTENSIONS = {
+    '.py', '.js', '.ts', '.jsx', '.tsx', 
+    '.java', '.c', '.cpp', '.h', '.cs', '.go', '.rs', 
+    '.php', '.rb', '.kt', '.swift','.cls'
+}
+
+MAX_FILE_SIZE = 100 * 1024 # 100KB limit per file
+
+_staging_locks = {}
+_staging_locks_guard = threading.Lock()
+
+
+def _scan_source(source_path: Path):
+    """
+    Yields (path, relative path, stat) for every code file under source_path.
+    Uses os.scandir so directories are pruned and files are filtered on
+    extension and size from directory entries, before anything is opened.
+    """
+    stack = [source_path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError as e:
+            print(f"Skipping directory {current}: {e}")
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORE_DIRS:
+                        stack.append(entry.path)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in ALLOWED_EXTENSIONS or not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError as e:
+                print(f"Skipping file {entry.path}: {e}")
+                continue
+            # Check File Size to avoid bloating context
+            if st.st_size > MAX_FILE_SIZE:
+                print(f"Skipping large file: {entry.name}")
+                continue
+            path = Path(entry.path)
+            yield path, path.relative_to(source_path), st
+
+
+def _stage_file(path: Path, relative_path: Path, st, previous: dict, files_dir: Path):
+    """
+    Writes one header-wrapped copy into files_dir unless the previous staging run
+    already produced it. Returns (record, written).
+    """
+    # Create flat filename: src/utils/helper.js -> src_utils_helper.js.txt
+    safe_name = str(relative_path).replace(os.sep, '_') + ".txt"
+    target = files_dir / safe_name
+    # Stat first: same size and mtime as last time -> reuse without opening the file
+    if previous and previous["name"] == safe_name and previous["size"] == st.st_size \
+            and previous["mtime_ns"] == st.st_mtime_ns and target.exists():
+        return previous, False
+
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    # Context Injection for GraphRAG
+    lang = path.suffix[1:] # py, js, etc
+    header = f"START FILE: {relative_path.as_posix()}\nLANGUAGE: {lang}\n-----------------------------------\n"
+    text = header + content
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    record = {"name": safe_name, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    if previous and previous["name"] == safe_name and previous["sha256"] == digest and target.exists():
+        return record, False
+
+    # New inode via rename: earlier copies hard-linked out of the cache keep their content
+    tmp_path = files_dir / f".{safe_name}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, target)
+    return record, True
+
+
+def _load_staging_state(cache_dir: Path):
+    try:
+        with open(cache_dir / STAGING_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_staging_state(cache_dir: Path, state: dict):
+    tmp_path = cache_dir / f"{STAGING_STATE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, cache_dir / STAGING_STATE_FILE)
+
+
+def _link_or_copy(src: Path, dst: Path):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def process_files(source_dir: str, dest_dir: str, cache_dir: str = None, workers: int = STAGING_WORKERS):
     """
     Walks through the source directory, reads code files, and copies them 
     as text files to the destination directory.
+
+    With a cache_dir, wrapped copies are kept there between runs together with
+    each source file's size, mtime and content hash: files whose size and mtime
+    (or, failing that, hash) match the previous run are not rewritten, and the
+    destination is filled with hard links to the cached copies.
     """
+    started = time.perf_counter()
     source_path = Path(source_dir)
     dest_path = Path(dest_dir)
 
@@ -146,56 +272,182 @@ def process_files(source_dir: str, dest_dir: str):
     else:
         dest_path.mkdir(parents=True, exist_ok=True)
 
-    # Optimized Filtering
-    ignore_dirs = {
-        '.git', '.idea', '.vscode', '__pycache__', 'node_modules', 
-        'dist', 'build', 'coverage', 'venv', 'env', 'bin', 'obj', 
-        'target', 'out', 'assets', 'images', 'media', 'test', 'tests'
-    }
-    
-    # Strict Code Only - Removed JSON/YAML to avoid data bloating
-    allowed_extensions = {
-        '.py', '.js', '.ts', '.jsx', '.tsx', 
-        '.java', '.c', '.cpp', '.h', '.cs', '.go', '.rs', 
-        '.php', '.rb', '.kt', '.swift','.cls'
-    }
+    if cache_dir is None:
+        return _stage_tree(source_path, dest_path, {}, workers, started)[0]
 
-    file_count = 0
-    max_file_size = 100 * 1024 # 100KB limit per file
+    cache_path = Path(cache_dir)
+    with _staging_locks_guard:
+        lock = _staging_locks.setdefault(str(cache_path.resolve()), threading.Lock())
+    with lock:
+        files_dir = cache_path / "files"
+        files_dir.mkdir(parents=True, exist_ok=True)
+        state = _load_staging_state(cache_path)
+        file_count, state = _stage_tree(source_path, files_dir, state, workers, started)
+        _save_staging_state(cache_path, state)
 
-    for root, dirs, files in os.walk(source_path):
-        # Prune ignored directories
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-            
-        for file in files:
-            file_path = Path(root) / file
-            
-            # Check Extension
-            if file_path.suffix.lower() not in allowed_extensions:
+        staged = {record["name"] for record in state.values()}
+        for entry in os.scandir(files_dir):
+            if entry.name not in staged:
+                # Source file removed (or a temp file left by an interrupted run)
+                os.unlink(entry.path)
+            else:
+                _link_or_copy(Path(entry.path), dest_path / entry.name)
+    return file_count
+
+
+def _stage_tree(source_path: Path, files_dir: Path, previous_state: dict, workers: int, started: float):
+    """Stages every code file under source_path into files_dir in parallel. Returns (count, new state)."""
+    def stage(item):
+        path, relative_path, st = item
+        key = relative_path.as_posix()
+        try:
+            record, written = _stage_file(path, relative_path, st, previous_state.get(key), files_dir)
+            return key, record, written, st.st_size
+        except Exception as e:
+            print(f"Skipping file {path}: {e}")
+            return key, None, False, 0
+
+    state = {}
+    written_count = 0
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="staging") as executor:
+        for key, record, written, size in executor.map(stage, _scan_source(source_path)):
+            if record is None:
                 continue
+            state[key] = record
+            written_count += written
+            total_bytes += size
 
-            # Check File Size to avoid bloating context
-            try:
-                if file_path.stat().st_size > max_file_size:
-                    print(f"Skipping large file: {file_path.name}")
-                    continue
-                    
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                
-                # Create flat filename: src/utils/helper.js -> src_utils_helper.js.txt
-                relative_path = file_path.relative_to(source_path)
-                safe_name = str(relative_path).replace(os.sep, '_') + ".txt"
-                
-                with open(dest_path / safe_name, 'w', encoding='utf-8') as f:
-                    # Context Injection for GraphRAG
-                    lang = file_path.suffix[1:] # py, js, etc
-                    header = f"START FILE: {relative_path.as_posix()}\nLANGUAGE: {lang}\n-----------------------------------\n"
-                    f.write(header + content)
-                    
-                file_count += 1
-            except Exception as e:
-                print(f"Skipping file {file_path}: {e}")
+    file_count = len(state)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    mb = total_bytes / (1024 * 1024)
+    print(f"📦 Staged {file_count} files ({mb:.1f} MB) in {elapsed:.2f}s: "
+          f"{file_count / elapsed:.0f} files/s, {mb / elapsed:.1f} MB/s "
+          f"({written_count} written, {file_count - written_count} unchanged since the last run)")
+    return file_count, state
 
-    return file_count
 
+# Uploads are copied to disk in chunks; memory per upload is bounded by one chunk
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+BINARY_SNIFF_BYTES = 8192
+
+
+def save_text_upload(src, target_path, chunk_size: int = UPLOAD_CHUNK_BYTES):
+    """
+    Streams an uploaded file object to target_path chunk by chunk, validating
+    UTF-8 incrementally. Content with a NUL byte near the start is treated as
+    binary. Returns the number of bytes written, or None (leaving nothing
+    behind) when the upload is binary or not valid UTF-8.
+    """
+    target_path = Path(target_path)
+    tmp_path = target_path.with_name(f".{target_path.name}.{threading.get_ident()}.upload")
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    written = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            first = True
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                if first and b"\x00" in chunk[:BINARY_SNIFF_BYTES]:
+                    raise UnicodeDecodeError("utf-8", chunk[:1], 0, 1, "binary content")
+                first = False
+                decoder.decode(chunk)
+                out.write(chunk)
+                written += len(chunk)
+            decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        tmp_path.unlink(missing_ok=True)
+        return None
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, target_path)
+    return written
+
+
+# Archives are spooled in memory up to this size, then to a temporary file on disk
+ARCHIVE_SPOOL_BYTES = 16 * 1024 * 1024
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def spool_stream(src, chunk_size: int = UPLOAD_CHUNK_BYTES):
+    """Copies a readable stream (HTTP response, upload) into a seekable spooled temp file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES)
+    shutil.copyfileobj(src, spool, chunk_size)
+    spool.seek(0)
+    return spool
+
+
+def _wanted_member(name: str, size: int):
+    """Applies process_files' directory, extension and size filters to an archive entry name."""
+    normalized = name.replace('\\', '/')
+    parts = [p for p in normalized.split('/') if p not in ('', '.')]
+    # No absolute paths, parent references, or drive / stream names (C:/x.py, x.py:ads) on Windows
+    if not parts or normalized.startswith('/') or any(p == '..' or ':' in p for p in parts):
+        return None
+    if any(part in IGNORE_DIRS for part in parts[:-1]):
+        return None
+    if os.path.splitext(parts[-1])[1].lower() not in ALLOWED_EXTENSIONS:
+        return None
+    if size > MAX_FILE_SIZE:
+        print(f"Skipping large file: {parts[-1]}")
+        return None
+    return Path(*parts)
+
+
+def _archive_members(archive):
+    """Yields (name, uncompressed size, open function) for each regular file in a zip or tar archive."""
+    if zipfile.is_zipfile(archive):
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as z:
+            for info in z.infolist():
+                # Unix mode in the high bits; symlink entries would otherwise be written as files
+                mode = info.external_attr >> 16
+                if not info.is_dir() and stat.S_IFMT(mode) in (0, stat.S_IFREG):
+                    yield info.filename, info.file_size, (lambda info=info: z.open(info))
+        return
+    archive.seek(0)
+    with tarfile.open(fileobj=archive, mode="r:*") as tf:
+        for member in tf:
+            if member.isfile():
+                yield member.name, member.size, (lambda member=member: tf.extractfile(member))
+
+
+def extract_code_files(archive, target_dir: str, chunk_size: int = UPLOAD_CHUNK_BYTES):
+    """
+    Extracts only the entries of a zip or tar archive (a seekable file object)
+    that process_files would keep: allowed extension, no ignored directory in
+    the path, within the size limit. Entries are filtered on their header
+    before anything is read, so ignored zip entries are never decompressed
+    (a compressed tar has to be decompressed sequentially to reach later
+    entries, but ignored ones are not written). Unsafe paths are skipped.
+    Returns (extracted, skipped) counts; raises ValueError for other formats.
+    """
+    started = time.perf_counter()
+    target_path = Path(target_dir).resolve()
+    extracted = skipped = total_bytes = 0
+    try:
+        for name, size, open_member in _archive_members(archive):
+            relative_path = _wanted_member(name, size)
+            if relative_path is None:
+                skipped += 1
+                continue
+            out_path = (target_path / relative_path).resolve()
+            if not out_path.is_relative_to(target_path):
+                print(f"Skipping unsafe archive entry: {name}")
+                skipped += 1
+                continue
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            with open_member() as src, open(out_path, 'wb') as out:
+                shutil.copyfileobj(src, out, chunk_size)
+            extracted += 1
+            total_bytes += size
+    except tarfile.ReadError as e:
+        raise ValueError(f"Unsupported archive format (expected zip or tar): {e}")
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"📦 Extracted {extracted} code files ({total_bytes / (1024 * 1024):.1f} MB) in {elapsed:.2f}s, "
+          f"skipped {skipped} filtered entries")
+    return extracted, skipped
@@ -0,0 +1,13 @@
+from fastapi.testclient import TestClient
+
+import simple_rag_app.main as main
+
+
+def test_graph_is_compiled_once_at_startup(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "get_main_graph", lambda: calls.append(1))
+
+    with TestClient(main.app) as client:
+        assert calls == [1]
+        client.get("/api/metrics")
+    assert calls == [1]
@@ -0,0 +1,90 @@
+import io
+import stat
+import tarfile
+import zipfile
+
+import pytest
+
+from simple_rag_app.utils import MAX_FILE_SIZE, _wanted_member, extract_code_files
+
+SAFE = {
+    "src/classes/A.cls": b"public class A {}",
+    "src\\win\\B.cls": b"public class B {}",
+}
+UNSAFE = {
+    "../x.cls": b"escape",
+    "../../etc/x.cls": b"escape",
+    "/etc/x.cls": b"absolute",
+    "C:x.cls": b"drive relative",
+    "C:/x.cls": b"drive absolute",
+    "x.cls:stream": b"alternate data stream",
+    "node_modules/lib/x.js": b"vendored",
+    "src/tests/T.cls": b"ignored dir",
+    "notes.txt": b"not code",
+}
+LINK_NAME = "src/classes/Link.cls"
+LINK_TARGET = "/etc/passwd"
+
+
+def _zip_archive():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for name, data in {**SAFE, **UNSAFE}.items():
+            z.writestr(name, data)
+        link = zipfile.ZipInfo(LINK_NAME)
+        link.external_attr = (stat.S_IFLNK | 0o777) << 16
+        z.writestr(link, LINK_TARGET)
+    buf.seek(0)
+    return buf
+
+
+def _tar_archive(mode="w:gz"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in {**SAFE, **UNSAFE}.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo(LINK_NAME)
+        link.type = tarfile.SYMTYPE
+        link.linkname = LINK_TARGET
+        tf.addfile(link)
+        hardlink = tarfile.TarInfo("src/classes/Hard.cls")
+        hardlink.type = tarfile.LNKTYPE
+        hardlink.linkname = "../x.cls"
+        tf.addfile(hardlink)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.parametrize("name", list(UNSAFE))
+def test_wanted_member_rejects_unsafe_and_ignored_entries(name):
+    assert _wanted_member(name, 10) is None
+
+
+def test_wanted_member_normalizes_safe_entries():
+    assert _wanted_member("src\\win\\B.cls", 10).as_posix() == "src/win/B.cls"
+    assert _wanted_member("./src/./A.cls", 10).as_posix() == "src/A.cls"
+    assert _wanted_member("src/A.cls", MAX_FILE_SIZE + 1) is None
+
+
+@pytest.mark.parametrize("make_archive", [_zip_archive, _tar_archive, lambda: _tar_archive("w")],
+                         ids=["zip", "tar.gz", "tar"])
+def test_extract_code_files_keeps_only_safe_entries(make_archive, tmp_path):
+    target = tmp_path / "target"
+    target.mkdir()
+
+    extracted, skipped = extract_code_files(make_archive(), str(target))
+
+    written = sorted(p.relative_to(target).as_posix() for p in target.rglob("*") if p.is_file())
+    assert written == ["src/classes/A.cls", "src/win/B.cls"]
+    assert (target / "src/classes/A.cls").read_bytes() == SAFE["src/classes/A.cls"]
+    assert (extracted, skipped) == (2, len(UNSAFE))
+    # Nothing escaped the target directory and no links were created
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["target"]
+    assert not any(p.is_symlink() for p in target.rglob("*"))
+
+
+def test_extract_code_files_rejects_other_formats(tmp_path):
+    with pytest.raises(ValueError):
+        extract_code_files(io.BytesIO(b"just some text, not an archive"), str(tmp_path))
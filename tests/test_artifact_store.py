@@ -0,0 +1,80 @@
+import shutil
+import threading
+
+import pandas as pd
+
+from agentic_copilot.retrieval.artifact_store import ArtifactStore
+
+
+def _version(root, name):
+    path = root / name
+    path.mkdir()
+    pd.DataFrame({"title": [name]}).to_parquet(path / "entities.parquet")
+    return str(path)
+
+
+def test_tables_and_derived_are_cached_until_the_file_changes(tmp_path):
+    store = ArtifactStore()
+    output_dir = _version(tmp_path, "v1")
+    builds = []
+
+    first = store.get_table(output_dir, "entities")
+    assert store.get_table(output_dir, "entities") is first
+    assert store.get_derived(output_dir, "titles", lambda d: builds.append(d) or ["v1"]) == ["v1"]
+    store.get_derived(output_dir, "titles", lambda d: builds.append(d))
+    assert len(builds) == 1
+
+    pd.DataFrame({"title": ["v1", "changed"]}).to_parquet(f"{output_dir}/entities.parquet")
+    assert len(store.get_table(output_dir, "entities")) == 2
+    assert store.stats()["loads"] == 2
+
+
+def test_invalidate_during_a_build_keeps_builds_serialized(tmp_path):
+    store = ArtifactStore()
+    output_dir = _version(tmp_path, "v1")
+    started, release = threading.Event(), threading.Event()
+    running, overlaps, results = [0], [], []
+
+    def builder(d):
+        running[0] += 1
+        overlaps.append(running[0])
+        started.set()
+        release.wait(5)
+        running[0] -= 1
+        return object()
+
+    first = threading.Thread(target=lambda: results.append(store.get_derived(output_dir, "index", builder)))
+    first.start()
+    assert started.wait(5)
+    store.invalidate()
+    second = threading.Thread(target=lambda: results.append(store.get_derived(output_dir, "index", builder)))
+    second.start()
+    second.join(0.2)
+    # The caller that arrived after the invalidation waits for the in-flight build
+    assert second.is_alive()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert overlaps == [1, 1]
+    # The build that straddled the invalidation was not cached; the second one was
+    assert results[0] is not results[1]
+    assert store.get_derived(output_dir, "index", builder) is results[1]
+
+
+def test_retain_evicts_previous_and_pruned_versions(tmp_path):
+    store = ArtifactStore()
+    old, previous, current = (_version(tmp_path, v) for v in ("v1", "v2", "v3"))
+    for d in (old, previous, current):
+        store.get_table(d, "entities")
+        store.get_derived(d, "titles", lambda d: ["x"])
+    shutil.rmtree(old)
+
+    store.retain(current)
+
+    assert store.stats()["tables"] == store.stats()["derived"] == 1
+    # Locks of the pruned version are released; the retained directories keep theirs
+    assert store.stats()["locks"] == 4
+    loads = store.stats()["loads"]
+    store.get_table(current, "entities")
+    assert store.stats()["loads"] == loads
@@ -0,0 +1,88 @@
+from agentic_copilot.agents.context_budget import ContextBudgeter, split_blocks, TOP_BLOCK_MAX_SHARE
+
+QUERY = "how does AccountSlackNotifyJob work"
+
+
+def _code_block(title, lines):
+    body = "\n".join(f"System.debug('{title} line {i}');" for i in range(lines))
+    return f"## {title}\n\n**Description:** posts account changes\n\n```apex\n{body}\n```"
+
+
+def _filler_block(i, words=60):
+    return f"## Other{i}\n\n**Description:** unrelated helper number {i} " + "filler words " * words
+
+
+def test_split_blocks_ignores_separators_inside_code():
+    text = "## A\n```\n---\ncode\n```\n---\n## B"
+
+    assert split_blocks(text) == ["## A\n```\n---\ncode\n```", "## B"]
+
+
+def test_top_ranked_block_is_not_crowded_out():
+    budgeter = ContextBudgeter(budget=1000)
+    top = _code_block("AccountSlackNotifyJob", 150)
+    # Many small, lower-ranked blocks listed before the match
+    items = ["\n---\n".join([_filler_block(i) for i in range(12)] + [top])]
+
+    context, report = budgeter.assemble(QUERY, [("Code Analysis Data", items)])
+
+    assert "## AccountSlackNotifyJob" in context
+    assert context.count("AccountSlackNotifyJob line") >= 10
+    assert report["blocks_truncated"] >= 1
+    # The top block takes at most its share, so other blocks still get in
+    assert report["blocks_kept"] > 1
+    assert budgeter.count(context.split("## Other")[0]) <= budgeter.budget * TOP_BLOCK_MAX_SHARE + 20
+
+
+def test_truncated_code_keeps_fences_balanced():
+    budgeter = ContextBudgeter(budget=600)
+    context, _ = budgeter.assemble(QUERY, [("Code Analysis Data", [_code_block("AccountSlackNotifyJob", 400)])])
+
+    assert context.count("```") % 2 == 0
+    assert "[truncated to fit context budget]" in context
+
+
+def test_layout_overhead_is_counted():
+    budgeter = ContextBudgeter(budget=800)
+    sections = [
+        ("Code Analysis Data", ["\n---\n".join(_filler_block(i, 20) for i in range(10))]),
+        ("Documentation", ["\n---\n".join(_filler_block(i + 10, 20) for i in range(10))]),
+    ]
+
+    context, report = budgeter.assemble(QUERY, sections)
+
+    assert report["used_tokens"] == budgeter.count(context)
+    assert report["used_tokens"] <= budgeter.budget
+    assert report["dropped_tokens"] > 0
+
+
+def test_nothing_dropped_when_everything_fits():
+    budgeter = ContextBudgeter(budget=5000)
+    blocks = [_filler_block(i, 5) for i in range(5)]
+
+    context, report = budgeter.assemble(QUERY, [("Code Analysis Data", ["\n---\n".join(blocks)])])
+
+    assert report["dropped_tokens"] == 0
+    # Headers and separators are part of what is used
+    assert report["used_tokens"] > report["input_tokens"]
+
+
+def test_blocks_that_do_not_fit_are_summarized():
+    budgeter = ContextBudgeter(budget=700)
+    blocks = [_code_block("AccountSlackNotifyJob", 60)] + [_code_block(f"Helper{i}", 60) for i in range(4)]
+
+    context, report = budgeter.assemble(QUERY, [("Code Analysis Data", ["\n---\n".join(blocks)])])
+
+    assert report["blocks_summarized"] >= 1
+    assert "[summarized to fit context budget]" in context
+    assert context.count("```") % 2 == 0
+    assert report["used_tokens"] <= budgeter.budget
+
+
+def test_small_inputs_are_kept_whole():
+    budgeter = ContextBudgeter(budget=5000)
+    context, report = budgeter.assemble(QUERY, [("Code Analysis Data", ["## A\nalpha", "## A\nalpha", "## B\nbeta"])])
+
+    assert context == "**Code Analysis Data:**\n## A\nalpha\n\n---\n\n## B\nbeta"
+    assert report["duplicates_removed"] == 1
+    assert report["blocks_truncated"] == report["blocks_summarized"] == 0
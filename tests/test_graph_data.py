@@ -0,0 +1,131 @@
+import json
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import simple_rag_app.main as main
+from agentic_copilot.retrieval.graph_index import GraphIndex
+from simple_rag_app.graph_data import graph_page_json, select_graph
+
+# Star around HUB plus a chain A - B - C; LONELY has no links and ORPHAN only appears in a relationship
+ENTITIES = pd.DataFrame({
+    "title": ["HUB", "S1", "S2", "S3", "A", "B", "C", "LONELY"],
+    "type": ["APEX_CLASS", "APEX_CLASS", "TRIGGER", "TRIGGER", "APEX_CLASS", "APEX_CLASS", "OBJECT", "OBJECT"],
+    "description": [f"desc {i}" for i in range(8)],
+})
+RELS = pd.DataFrame({
+    "source": ["HUB", "HUB", "HUB", "A", "B", "S1", "C"],
+    "target": ["S1", "S2", "S3", "B", "C", "A", "ORPHAN"],
+    "weight": [1.0, 2.0, 3.0, 1.0, 1.0, 1.0, 1.0],
+    "description": ["x" * 40, "short", None, "a-b", "b-c", "s1-a", "c-orphan"],
+})
+
+
+@pytest.fixture
+def graph():
+    return GraphIndex(ENTITIES, RELS)
+
+
+def _pages(graph, limit, **kwargs):
+    offset, pages = 0, []
+    while offset is not None:
+        body = json.loads(graph_page_json(ENTITIES, RELS, graph, limit, offset, **kwargs))
+        pages.append(body)
+        offset = body["next_offset"]
+    return pages
+
+
+def test_nodes_are_ordered_by_degree(graph):
+    nodes, links, total = select_graph(ENTITIES, RELS, graph, limit=0)
+
+    assert total == len(ENTITIES)
+    assert nodes["name"].tolist() == ["HUB", "S1", "A", "B", "C", "S2", "S3", "LONELY"]
+    assert nodes["degree"].tolist() == [3, 2, 2, 2, 2, 1, 1, 0]
+    # Links to nodes outside the entity table never reach the client
+    assert "ORPHAN" not in set(links["target"])
+    assert len(links) == len(RELS) - 1
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5])
+def test_pagination_delivers_every_link_once(graph, limit):
+    pages = _pages(graph, limit)
+    _, all_links, _ = select_graph(ENTITIES, RELS, graph, limit=0)
+
+    names = [n["name"] for page in pages for n in page["nodes"]]
+    links = [(l["source"], l["target"]) for page in pages for l in page["links"]]
+    assert len(names) == len(set(names)) == len(ENTITIES)
+    assert sorted(links) == sorted(zip(all_links["source"], all_links["target"]))
+    assert len(links) == len(set(links))
+    assert pages[-1]["next_offset"] is None
+    assert all(page["total_nodes"] == len(ENTITIES) for page in pages)
+    # Each link only references nodes the client already has
+    seen = set()
+    for page in pages:
+        seen.update(n["name"] for n in page["nodes"])
+        assert all(l["source"] in seen and l["target"] in seen for l in page["links"])
+
+
+def test_filters_and_labels(graph):
+    nodes, links, total = select_graph(ENTITIES, RELS, graph, limit=0, types=["trigger", " "], min_degree=1)
+
+    assert total == 2
+    assert nodes["name"].tolist() == ["S2", "S3"]
+    assert links.empty
+
+    _, links, _ = select_graph(ENTITIES, RELS, graph, limit=0)
+    labels = dict(zip(zip(links["source"], links["target"]), links["label"]))
+    assert labels[("HUB", "S1")] == "x" * 30 + "..."
+    assert labels[("HUB", "S2")] == "short"
+    assert labels[("HUB", "S3")] == ""
+
+
+def test_offset_past_the_end(graph):
+    body = json.loads(graph_page_json(ENTITIES, RELS, graph, limit=5, offset=100))
+
+    assert body["nodes"] == [] and body["links"] == []
+    assert body["next_offset"] is None
+
+
+def test_etag_matching():
+    etag = main.graph_etag("v1", 10, 0, 0, [])
+
+    assert etag == main.graph_etag("v1", 10, 0, 0, [])
+    assert etag != main.graph_etag("v2", 10, 0, 0, [])
+    assert etag != main.graph_etag("v1", 10, 10, 0, [])
+    assert main.etag_matches(etag, etag)
+    assert main.etag_matches(f'"other", W/{etag}', etag)
+    assert main.etag_matches("*", etag)
+    assert not main.etag_matches(None, etag)
+    assert not main.etag_matches('"other"', etag)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    ENTITIES.to_parquet(output_dir / "entities.parquet")
+    RELS.to_parquet(output_dir / "relationships.parquet")
+    monkeypatch.setattr(main, "get_latest_output_dir", lambda: str(output_dir))
+    main._graph_responses.clear()
+    return TestClient(main.app), output_dir
+
+
+def test_graph_endpoint_revalidates_with_etag(client):
+    client, output_dir = client
+
+    first = client.get("/api/graph", params={"limit": 3})
+    assert first.status_code == 200
+    assert first.json()["next_offset"] == 3
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/graph", params={"limit": 3}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert client.get("/api/graph", params={"limit": 3, "offset": 3}, headers={"If-None-Match": etag}).status_code == 200
+
+    # A new index version changes the ETag, so the stale page is sent again
+    RELS.iloc[:2].to_parquet(output_dir / "relationships.parquet")
+    refreshed = client.get("/api/graph", params={"limit": 3}, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
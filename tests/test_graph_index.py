@@ -0,0 +1,100 @@
+import random
+from collections import deque
+
+import pandas as pd
+
+from agentic_copilot.retrieval.graph_index import GraphIndex
+
+
+def _index(titles, rels):
+    """rels = (source, target, weight) rows of relationships.parquet."""
+    df_entities = pd.DataFrame({"title": titles})
+    df_rels = pd.DataFrame(
+        [{"source": s, "target": t, "weight": w, "description": f"{s}->{t}"} for s, t, w in rels],
+        columns=["source", "target", "weight", "description"],
+    )
+    return GraphIndex(df_entities, df_rels)
+
+
+def _bfs_distance(graph, source, target):
+    seen = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for neighbor in graph.neighbors(node)[0].tolist():
+            if neighbor not in seen:
+                seen[neighbor] = seen[node] + 1
+                queue.append(neighbor)
+    return seen.get(target)
+
+
+# A - B - C - D chain, plus A - E; F is isolated. GHOST only appears in a relationship.
+TITLES = ["A", "B", "C", "D", "E", "F"]
+RELS = [("A", "B", 1.0), ("B", "C", 1.0), ("C", "D", 1.0), ("A", "E", 5.0), ("d", "ghost", 1.0)]
+
+
+def test_csr_layout_and_edges():
+    graph = _index(TITLES, RELS)
+    a, e, d = graph.node("a"), graph.node("E"), graph.node("D")
+
+    # Relationship-only titles get nodes past the entity rows
+    assert graph.node("GHOST") == len(TITLES)
+    assert graph.size == len(TITLES) + 1
+    # Both directions are stored, heaviest neighbour first
+    assert graph.neighbors(a)[0].tolist() == [e, graph.node("B")]
+    assert graph.degree(d) == 2
+    assert graph.edge(e, a) == (5.0, "A->E")
+    assert graph.edge(a, d) is None
+
+
+def test_shortest_path():
+    graph = _index(TITLES, RELS)
+    n = graph.node
+
+    assert graph.shortest_path(n("A"), n("A")) == [n("A")]
+    assert graph.shortest_path(n("E"), n("D")) == [n("E"), n("A"), n("B"), n("C"), n("D")]
+    assert graph.shortest_path(n("D"), n("E")) == [n("D"), n("C"), n("B"), n("A"), n("E")]
+    assert graph.shortest_path(n("E"), n("GHOST"), max_hops=4) is None
+    assert graph.shortest_path(n("E"), n("GHOST"), max_hops=5)[-1] == n("GHOST")
+    assert graph.shortest_path(n("A"), n("F")) is None
+
+
+def test_shortest_path_matches_bfs_on_random_graphs():
+    rng = random.Random(7)
+    for _ in range(20):
+        titles = [f"N{i}" for i in range(30)]
+        rels = [(rng.choice(titles), rng.choice(titles), rng.random()) for _ in range(45)]
+        graph = _index(titles, rels)
+        for _ in range(20):
+            source, target = rng.randrange(graph.size), rng.randrange(graph.size)
+            path = graph.shortest_path(source, target, max_hops=30)
+            expected = _bfs_distance(graph, source, target)
+            if expected is None:
+                assert path is None
+                continue
+            assert len(path) - 1 == expected
+            assert (path[0], path[-1]) == (source, target)
+            assert all(graph.edge(u, v) is not None for u, v in zip(path, path[1:]))
+
+
+def test_expand_hops_and_limits():
+    graph = _index(TITLES, RELS)
+    n = graph.node
+
+    assert graph.expand([n("A")], hops=1) == {n("A"): 0, n("B"): 1, n("E"): 1}
+    assert graph.expand([n("A")], hops=2) == {n("A"): 0, n("B"): 1, n("E"): 1, n("C"): 2}
+    # Only the heaviest neighbour of each node is followed
+    assert graph.expand([n("A")], hops=2, per_node_limit=1) == {n("A"): 0, n("E"): 1}
+    assert len(graph.expand([n("A")], hops=5, max_nodes=3)) == 3
+    assert graph.expand([n("F")], hops=3) == {n("F"): 0}
+    # Several seeds all start at distance 0
+    assert graph.expand([n("A"), n("D")], hops=1) == {n("A"): 0, n("D"): 0, n("B"): 1, n("E"): 1, n("C"): 1, n("GHOST"): 1}
+
+
+def test_graph_without_relationships():
+    graph = GraphIndex(pd.DataFrame({"title": ["A", "B"]}), None)
+
+    assert graph.size == 2
+    assert graph.degree(0) == 0
+    assert graph.expand([0]) == {0: 0}
+    assert graph.shortest_path(0, 1) is None
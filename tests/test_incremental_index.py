@@ -0,0 +1,145 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agentic_copilot.retrieval.incremental_index import (
+    ManifestDiff, merge_artifacts, plan_reindex, save_manifest,
+)
+
+
+def _write_index(out, docs, ents, rels, comms):
+    """
+    Writes a minimal GraphRAG output: one text unit per document,
+    ents = (id, title, [docs]), rels = (id, source, target, [docs]),
+    comms = (community, [entity ids]).
+    """
+    os.makedirs(out, exist_ok=True)
+    tag = os.path.basename(out)
+    tables = {
+        "documents": [
+            dict(id=f"D-{t}", human_readable_id=i, title=t, text="x", text_unit_ids=np.array([f"T-{t}"]))
+            for i, t in enumerate(docs)
+        ],
+        "text_units": [
+            dict(id=f"T-{t}", human_readable_id=i, text=f"chunk of {t}", n_tokens=3,
+                 document_ids=np.array([f"D-{t}"]),
+                 entity_ids=np.array([e[0] for e in ents if t in e[2]]),
+                 relationship_ids=np.array([], dtype=str))
+            for i, t in enumerate(docs)
+        ],
+        "entities": [
+            dict(id=e[0], human_readable_id=i, title=e[1], type="APEX_CLASS", description=f"{e[1]} desc {tag}",
+                 text_unit_ids=np.array([f"T-{t}" for t in e[2]]), frequency=len(e[2]), degree=0)
+            for i, e in enumerate(ents)
+        ],
+        "relationships": [
+            dict(id=r[0], human_readable_id=i, source=r[1], target=r[2], description=f"{r[1]}->{r[2]}",
+                 weight=2.0, combined_degree=0, text_unit_ids=np.array([f"T-{t}" for t in r[3]]))
+            for i, r in enumerate(rels)
+        ],
+        "communities": [
+            dict(id=f"C{c}", human_readable_id=c, community=c, level=0, parent=-1, children=np.array([], dtype=int),
+                 title=f"Community {c}", entity_ids=np.array(m), relationship_ids=np.array([], dtype=str),
+                 text_unit_ids=np.array([], dtype=str), size=len(m))
+            for c, m in comms
+        ],
+        "community_reports": [
+            dict(id=f"CR{c}", human_readable_id=c, community=c, level=0, parent=-1, children=np.array([], dtype=int),
+                 title=f"Report {c}", summary="s", full_content="f", rank=1.0)
+            for c, m in comms
+        ],
+    }
+    for name, rows in tables.items():
+        pd.DataFrame(rows).to_parquet(os.path.join(out, f"{name}.parquet"))
+
+
+@pytest.fixture
+def previous_and_delta(tmp_path):
+    # Previous version indexed a, b, c. The new input keeps a, changes b, drops c and adds d,
+    # so the delta run only saw b and d.
+    previous_dir = str(tmp_path / "prev")
+    delta_dir = str(tmp_path / "delta")
+    _write_index(previous_dir, ["a.py.txt", "b.py.txt", "c.py.txt"],
+                 [("e1", "ALPHA", ["a.py.txt"]), ("e2", "BETA", ["a.py.txt", "b.py.txt"]), ("e3", "GAMMA", ["c.py.txt"])],
+                 [("r1", "ALPHA", "BETA", ["a.py.txt"]), ("r2", "BETA", "GAMMA", ["b.py.txt", "c.py.txt"])],
+                 [(0, ["e1", "e2"]), (1, ["e3"])])
+    save_manifest(previous_dir, {"a.py.txt": "h1", "b.py.txt": "h2", "c.py.txt": "h3"})
+    _write_index(delta_dir, ["b.py.txt", "d.py.txt"],
+                 [("n2", "BETA", ["b.py.txt"]), ("n4", "DELTA", ["d.py.txt"])],
+                 [("nr1", "BETA", "DELTA", ["d.py.txt"])],
+                 [(0, ["n2", "n4"])])
+    manifest = {"a.py.txt": "h1", "b.py.txt": "h2-new", "d.py.txt": "h4"}
+    return previous_dir, delta_dir, manifest
+
+
+def test_manifest_diff_classifies_files():
+    diff = ManifestDiff({"a": "1", "b": "2", "c": "3"}, {"a": "1", "b": "9", "d": "4"})
+
+    assert (diff.added, diff.changed, diff.removed, diff.unchanged) == (["d"], ["b"], ["c"], ["a"])
+    assert diff.to_index == ["d", "b"]
+    assert diff.stale == ["b", "c"]
+
+
+def test_plan_reindex(previous_and_delta, tmp_path):
+    previous_dir, _, manifest = previous_and_delta
+
+    assert plan_reindex(str(tmp_path / "missing"), manifest) == ("full", None)
+    assert plan_reindex(previous_dir, {"a.py.txt": "h1", "b.py.txt": "h2", "c.py.txt": "h3"})[0] == "unchanged"
+    mode, diff = plan_reindex(previous_dir, {**manifest, "a.py.txt": "h1-new"})
+    assert mode == "full"
+    mode, diff = plan_reindex(previous_dir, {"a.py.txt": "h1", "b.py.txt": "h2", "c.py.txt": "h3", "d.py.txt": "h4"})
+    assert mode == "incremental" and diff.added == ["d.py.txt"]
+
+
+def test_merge_artifacts(previous_and_delta, tmp_path):
+    previous_dir, delta_dir, manifest = previous_and_delta
+    diff = ManifestDiff({"a.py.txt": "h1", "b.py.txt": "h2", "c.py.txt": "h3"}, manifest)
+    out_dir = str(tmp_path / "merged")
+
+    merge_artifacts(previous_dir, delta_dir, diff, out_dir)
+
+    read = lambda name: pd.read_parquet(os.path.join(out_dir, f"{name}.parquet"))
+    documents, text_units = read("documents"), read("text_units")
+    entities, relationships = read("entities"), read("relationships")
+    communities, reports = read("communities"), read("community_reports")
+
+    # Stale documents (changed b, removed c) and their text units are replaced by the delta's
+    assert sorted(documents["title"]) == ["a.py.txt", "b.py.txt", "d.py.txt"]
+    assert documents.set_index("title").loc["b.py.txt", "id"] == "D-b.py.txt"
+    assert sorted(text_units["id"]) == ["T-a.py.txt", "T-b.py.txt", "T-d.py.txt"]
+
+    # Entities are matched by title: BETA keeps its previous id, GAMMA (only in c) is gone
+    by_title = entities.set_index("title")
+    assert sorted(by_title.index) == ["ALPHA", "BETA", "DELTA"]
+    assert by_title.loc["BETA", "id"] == "e2"
+    assert sorted(by_title.loc["BETA", "text_unit_ids"]) == ["T-a.py.txt", "T-b.py.txt"]
+    assert by_title.loc["DELTA", "id"] == "n4"
+
+    # Relationships touching dropped entities are removed; degrees are recomputed
+    assert sorted(zip(relationships["source"], relationships["target"])) == [("ALPHA", "BETA"), ("BETA", "DELTA")]
+    assert by_title["degree"].to_dict() == {"ALPHA": 1, "BETA": 2, "DELTA": 1}
+    assert sorted(relationships["combined_degree"]) == [3, 3]
+
+    # Delta entity ids in text units are rewritten to the surviving ids
+    units = text_units.set_index("id")
+    assert sorted(units.loc["T-b.py.txt", "entity_ids"]) == ["e2"]
+
+    # Previous communities keep their numbers, delta communities are offset past them
+    assert sorted(communities["community"]) == [0, 2]
+    assert (communities["human_readable_id"] == communities["community"]).all()
+    assert sorted(reports["community"]) == [0, 2]
+
+
+def test_merge_artifacts_with_only_removals(previous_and_delta, tmp_path):
+    previous_dir, _, _ = previous_and_delta
+    diff = ManifestDiff({"a.py.txt": "h1", "b.py.txt": "h2", "c.py.txt": "h3"}, {"a.py.txt": "h1", "b.py.txt": "h2"})
+    out_dir = str(tmp_path / "merged")
+
+    merge_artifacts(previous_dir, None, diff, out_dir)
+
+    entities = pd.read_parquet(os.path.join(out_dir, "entities.parquet"))
+    documents = pd.read_parquet(os.path.join(out_dir, "documents.parquet"))
+    assert sorted(documents["title"]) == ["a.py.txt", "b.py.txt"]
+    assert sorted(entities["title"]) == ["ALPHA", "BETA"]
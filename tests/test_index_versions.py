@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from agentic_copilot.retrieval.index_versions import (
+    CURRENT_POINTER, clear_versions, find_artifacts_dir, list_versions, publish_version, resolve_current_version,
+)
+
+
+def _run_output(root, tag):
+    """A graphrag output directory holding one artifact tagged with `tag`."""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "entities.parquet"), "w") as f:
+        f.write(tag)
+    return str(root)
+
+
+def _read(version_dir):
+    with open(os.path.join(version_dir, "entities.parquet")) as f:
+        return f.read()
+
+
+@pytest.fixture
+def versions_dir(tmp_path):
+    return str(tmp_path / "versions")
+
+
+def test_nothing_published(versions_dir):
+    assert resolve_current_version(versions_dir) is None
+    assert list_versions(versions_dir) == []
+
+
+def test_publish_makes_an_immutable_copy_current(tmp_path, versions_dir):
+    source = _run_output(tmp_path / "output", "run 1")
+
+    published = publish_version(source, versions_dir)
+
+    assert resolve_current_version(versions_dir) == published
+    assert list_versions(versions_dir) == [os.path.basename(published)]
+    # The next graphrag run rewrites its output in place; the published copy is unaffected
+    _run_output(source, "run 2")
+    assert _read(published) == "run 1"
+
+    second = publish_version(source, versions_dir)
+    assert resolve_current_version(versions_dir) == second
+    assert _read(second) == "run 2"
+    assert list_versions(versions_dir) == sorted(os.path.basename(p) for p in (published, second))
+
+
+def test_publish_copies_lancedb_from_outside_the_artifacts_dir(tmp_path, versions_dir):
+    source = _run_output(tmp_path / "output" / "20240101-000000" / "artifacts", "run")
+    lancedb_dir = tmp_path / "output" / "lancedb"
+    lancedb_dir.mkdir()
+    (lancedb_dir / "default-entity-description.lance").write_text("vectors")
+
+    published = publish_version(source, versions_dir, lancedb_dir=str(lancedb_dir))
+
+    assert os.path.exists(os.path.join(published, "lancedb", "default-entity-description.lance"))
+
+
+def test_old_versions_and_staging_leftovers_are_pruned(tmp_path, versions_dir):
+    source = _run_output(tmp_path / "output", "run")
+    os.makedirs(os.path.join(versions_dir, "00000000-crashed.staging"))
+
+    published = [publish_version(source, versions_dir, retention=2) for _ in range(4)]
+
+    assert list_versions(versions_dir) == [os.path.basename(p) for p in published[-2:]]
+    assert sorted(os.listdir(versions_dir)) == sorted([CURRENT_POINTER] + list_versions(versions_dir))
+    assert resolve_current_version(versions_dir) == published[-1]
+
+
+def test_pointer_to_missing_version_resolves_to_none(tmp_path, versions_dir):
+    published = publish_version(_run_output(tmp_path / "output", "run"), versions_dir)
+
+    with open(os.path.join(versions_dir, CURRENT_POINTER), "w") as f:
+        f.write("does-not-exist\n")
+    assert resolve_current_version(versions_dir) is None
+
+    with open(os.path.join(versions_dir, CURRENT_POINTER), "w") as f:
+        f.write(os.path.basename(published) + "\n")
+    assert resolve_current_version(versions_dir) == published
+
+
+def test_clear_versions(tmp_path, versions_dir):
+    publish_version(_run_output(tmp_path / "output", "run"), versions_dir)
+
+    clear_versions(versions_dir)
+
+    assert not os.path.exists(versions_dir)
+    assert resolve_current_version(versions_dir) is None
+
+
+def test_find_artifacts_dir(tmp_path):
+    root = tmp_path / "output"
+    root.mkdir()
+    assert find_artifacts_dir(str(root)) is None
+
+    older = _run_output(root / "20240101-000000" / "artifacts", "old")
+    newer = _run_output(root / "20240102-000000" / "artifacts", "new")
+    os.utime(older, (1, 1))
+    assert find_artifacts_dir(str(root)) == newer
+
+    _run_output(root, "flat")
+    assert find_artifacts_dir(str(root)) == str(root)
@@ -0,0 +1,161 @@
+import json
+import asyncio
+
+import pytest
+
+from agentic_copilot.agents import query_router
+from agentic_copilot.cache.lru_cache import PersistentLRUCache
+
+
+class _FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeRouterChain:
+    """Stands in for prompt | ChatOpenAI; counts calls and returns a fixed JSON answer."""
+
+    def __init__(self, answer=None, error=None):
+        self.answer = answer
+        self.error = error
+        self.calls = []
+
+    def _reply(self, inputs):
+        self.calls.append(inputs["query"])
+        if self.error is not None:
+            raise self.error
+        return _FakeMessage(json.dumps(self.answer))
+
+    def invoke(self, inputs):
+        return self._reply(inputs)
+
+    async def ainvoke(self, inputs):
+        return self._reply(inputs)
+
+
+LLM_ROUTE = {"intent": "explain", "search_method": "global"}
+
+
+@pytest.fixture(autouse=True)
+def router_cache(monkeypatch):
+    # In-memory cache so tests never read or write .copilot_cache/router_cache.json
+    cache = PersistentLRUCache(max_entries=64)
+    monkeypatch.setattr(query_router, "_router_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    chain = _FakeRouterChain(answer=LLM_ROUTE)
+    monkeypatch.setattr(query_router, "_router_chain", lambda: chain)
+    return chain
+
+
+# Paraphrases of the documented query classes; none of them is in LABELLED_EXAMPLES
+@pytest.mark.parametrize("query, intent, search_method", [
+    ("What does this codebase do?", "explain", "community"),
+    ("what features does this app offer", "explain", "community"),
+    ("list every custom object", "general", "community"),
+    ("show me all lightning components", "general", "community"),
+    ("how is the system architecture laid out", "explain", "global"),
+    ("what design patterns does the codebase follow", "explain", "global"),
+    ("how does the AccountPhoneUpdate trigger work", "explain", "local"),
+    ("refactor the AccountPhoneUpdate trigger to be bulk safe", "refactor", "local"),
+    ("why does SlackNotifier throw an exception", "debug", "local"),
+    ("fix the failing callout", "debug", "local"),
+    ("what is affected if i rename the phone field", "impact_analysis", "local"),
+    ("what breaks if i remove SlackNotifier", "impact_analysis", "local"),
+])
+def test_route_locally_held_out_paraphrases(query, intent, search_method):
+    assert query not in {ex[0] for ex in query_router.LABELLED_EXAMPLES}
+    route = query_router.route_locally(query)
+
+    assert route is not None
+    assert route["source"] == "local"
+    assert (route["intent"], route["search_method"]) == (intent, search_method)
+    assert all(c >= query_router.LOCAL_CONFIDENCE_THRESHOLD for c in route["confidence"].values())
+
+
+@pytest.mark.parametrize("query", [
+    "delete all classes",
+    "remove all the triggers",
+    "erase all apex classes",
+])
+def test_destructive_all_queries_are_not_routed_as_listings(query):
+    route = query_router.route_locally(query)
+
+    # Either the LLM decides, or the classifier recognised a change request
+    assert route is None or route["intent"] == "impact_analysis"
+
+
+def test_route_locally_declines_unknown_and_low_confidence_queries():
+    # No known features at all
+    assert query_router.route_locally("quantum banana") is None
+    # Known words, but the heads disagree too much to clear the threshold
+    assert query_router.route_locally("list the code") is None
+    # A confident query still falls through when the threshold is raised
+    assert query_router.route_locally("list all apex classes", threshold=1.01) is None
+    # An unseen leading verb can change the meaning entirely
+    assert query_router.route_locally("enumerate all apex classes") is None
+
+
+def test_route_query_falls_back_to_llm_below_threshold(llm):
+    route = query_router.route_query("list the code")
+
+    assert llm.calls == ["list the code"]
+    assert route["source"] == "llm"
+    assert route["search_method"] == "global"
+
+
+def test_route_query_skips_llm_when_confident(llm):
+    route = query_router.route_query("list all triggers")
+
+    assert route["source"] == "local"
+    assert llm.calls == []
+
+
+def test_llm_route_is_validated(monkeypatch):
+    chain = _FakeRouterChain(answer={"intent": "dance", "search_method": "community", "query_type": "list_all"})
+    monkeypatch.setattr(query_router, "_router_chain", lambda: chain)
+
+    route = query_router.route_query("quantum banana")
+
+    assert route == {"intent": query_router.DEFAULT_ROUTE["intent"], "search_method": "community", "source": "llm"}
+
+
+def test_llm_failure_returns_default_route(monkeypatch, router_cache):
+    chain = _FakeRouterChain(error=RuntimeError("no network"))
+    monkeypatch.setattr(query_router, "_router_chain", lambda: chain)
+
+    route = query_router.route_query("quantum banana")
+
+    assert route == {**query_router.DEFAULT_ROUTE, "source": "default"}
+    assert len(router_cache) == 0
+
+
+def test_llm_routes_are_memoized_on_normalized_query(llm, router_cache):
+    first = query_router.route_query("quantum banana")
+    second = query_router.route_query("  Quantum   BANANA?")
+
+    assert llm.calls == ["quantum banana"]
+    assert first["source"] == "llm"
+    assert second["source"] == "cache"
+    assert {k: second[k] for k in LLM_ROUTE} == LLM_ROUTE
+    assert router_cache.stats()["hits"] == 1
+
+
+def test_async_route_shares_the_memo(llm):
+    query_router.route_query("quantum banana")
+    route = asyncio.run(query_router.aroute_query("quantum banana"))
+
+    assert route["source"] == "cache"
+    assert len(llm.calls) == 1
+
+
+def test_memo_key_changes_with_prompt(llm, monkeypatch):
+    query_router.route_query("quantum banana")
+    monkeypatch.setattr(query_router, "ROUTER_SYSTEM_PROMPT", query_router.ROUTER_SYSTEM_PROMPT + "\nBe terse.")
+    route = query_router.route_query("quantum banana")
+
+    assert route["source"] == "llm"
+    assert len(llm.calls) == 2
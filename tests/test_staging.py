@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from simple_rag_app.utils import MAX_FILE_SIZE, STAGING_STATE_FILE, process_files
+
+
+@pytest.fixture
+def tree(tmp_path):
+    source = tmp_path / "repo"
+    (source / "src" / "classes").mkdir(parents=True)
+    (source / "node_modules" / "lib").mkdir(parents=True)
+    (source / "src" / "classes" / "A.cls").write_text("public class A {}")
+    (source / "src" / "B.py").write_text("print('b')")
+    (source / "README.md").write_text("docs")
+    (source / "node_modules" / "lib" / "x.js").write_text("vendored")
+    (source / "big.py").write_text("x" * (MAX_FILE_SIZE + 1))
+    return source, tmp_path / "input", tmp_path / "cache"
+
+
+def _staged(dest):
+    return {p.name: p.read_text() for p in dest.iterdir()}
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_process_files_stages_code_with_headers(tree, cached):
+    source, dest, cache = tree
+
+    count = process_files(str(source), str(dest), str(cache) if cached else None)
+
+    staged = _staged(dest)
+    assert count == 2
+    assert sorted(staged) == ["src_B.py.txt", "src_classes_A.cls.txt"]
+    assert staged["src_classes_A.cls.txt"].startswith("START FILE: src/classes/A.cls\nLANGUAGE: cls\n")
+    assert staged["src_classes_A.cls.txt"].endswith("public class A {}")
+
+
+def test_cached_staging_rewrites_only_changed_files(tree, capsys):
+    source, dest, cache = tree
+    process_files(str(source), str(dest), str(cache))
+    cached_a = cache / "files" / "src_classes_A.cls.txt"
+    cached_b = cache / "files" / "src_B.py.txt"
+    inode_a, inode_b = cached_a.stat().st_ino, cached_b.stat().st_ino
+    # Destination entries are hard links to the cached copies
+    assert (dest / "src_classes_A.cls.txt").stat().st_ino == inode_a
+
+    capsys.readouterr()
+    (source / "src" / "B.py").write_text("print('changed')")
+    (source / "src" / "C.ts").write_text("export const c = 1")
+    count = process_files(str(source), str(dest), str(cache))
+
+    assert count == 3
+    assert "(2 written, 1 unchanged since the last run)" in capsys.readouterr().out
+    assert cached_a.stat().st_ino == inode_a
+    # Rewritten via rename: a new inode, so links handed out earlier keep the old content
+    assert cached_b.stat().st_ino != inode_b
+    assert _staged(dest)["src_B.py.txt"].endswith("print('changed')")
+
+    state = json.loads((cache / STAGING_STATE_FILE).read_text())
+    assert sorted(state) == ["src/B.py", "src/C.ts", "src/classes/A.cls"]
+
+
+def test_touched_but_identical_files_are_not_rewritten(tree, capsys):
+    source, dest, cache = tree
+    process_files(str(source), str(dest), str(cache))
+    inode = (cache / "files" / "src_B.py.txt").stat().st_ino
+
+    path = source / "src" / "B.py"
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    capsys.readouterr()
+    process_files(str(source), str(dest), str(cache))
+
+    assert "(0 written, 2 unchanged since the last run)" in capsys.readouterr().out
+    assert (cache / "files" / "src_B.py.txt").stat().st_ino == inode
+
+
+def test_removed_files_leave_the_cache_and_destination(tree):
+    source, dest, cache = tree
+    process_files(str(source), str(dest), str(cache))
+    (dest / "stale.txt").write_text("left over from another upload")
+
+    (source / "src" / "B.py").unlink()
+    count = process_files(str(source), str(dest), str(cache))
+
+    assert count == 1
+    assert sorted(_staged(dest)) == ["src_classes_A.cls.txt"]
+    assert sorted(os.listdir(cache / "files")) == ["src_classes_A.cls.txt"]
+
+
+def test_deleted_cache_copy_is_restaged(tree):
+    source, dest, cache = tree
+    process_files(str(source), str(dest), str(cache))
+
+    (cache / "files" / "src_classes_A.cls.txt").unlink()
+    process_files(str(source), str(dest), str(cache))
+
+    assert _staged(dest)["src_classes_A.cls.txt"].endswith("public class A {}")
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import simple_rag_app.main as main
+
+
+class _FakeJobQueue:
+    """Records started jobs instead of running graphrag."""
+
+    def __init__(self, staging_dir):
+        self.staging_dir = staging_dir
+        self.started = []
+
+    def create_job(self, kind):
+        return SimpleNamespace(id="job-1", kind=kind, staging_dir=self.staging_dir)
+
+    def start(self, job):
+        self.started.append(job)
+
+    def discard(self, job):
+        pass
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    queue = _FakeJobQueue(tmp_path)
+    monkeypatch.setattr(main, "_index_job_queue", lambda: queue)
+    client = TestClient(main.app)
+    return lambda files: client.post("/api/ingest/upload", files=[("files", f) for f in files]), queue
+
+
+def test_duplicate_file_names_keep_the_first_upload(upload, tmp_path):
+    post, queue = upload
+
+    response = post([
+        ("force-app/classes/Util.cls", b"first"),
+        ("other/classes/Util.cls", b"second"),
+        ("node_modules/x/index.js", b"vendored"),
+        ("force-app/classes/Main.cls", b"main"),
+    ])
+
+    assert response.status_code == 202
+    assert (tmp_path / "Util.cls").read_text() == "first"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Main.cls", "Util.cls"]
+    job = queue.started[0]
+    assert (job.files_staged, job.files_skipped) == (2, 2)
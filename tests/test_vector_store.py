@@ -0,0 +1,60 @@
+import pytest
+
+from agentic_copilot.retrieval.vector_store import (
+    LANCEDB_CONTAINER, LANCEDB_TABLES, HashingEmbedder, NumpyVectorIndex, VectorRetriever, open_lancedb_indexes,
+)
+
+# (id, "title:description") as GraphRAG embeds entity-description
+ENTITIES = [
+    ("e1", "AccountSlackNotifyJob:Queueable job that posts account changes to Slack"),
+    ("e2", "SlackNotifier:Sends messages to a Slack webhook"),
+    ("e3", "AccountSummaryService:Builds account summaries from opportunities"),
+    ("e4", "AccountPhoneUpdate:Trigger that normalizes account phone numbers"),
+    ("e5", "Account_Feedback__c:Custom object storing customer feedback"),
+]
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+    first = embedder.embed_query("AccountSlackNotifyJob")
+
+    assert first == HashingEmbedder(dim=64).embed_query("AccountSlackNotifyJob")
+    assert len(first) == 64
+    assert sum(x * x for x in first) == pytest.approx(1.0, rel=1e-5)
+    assert embedder.embed_query("") == [0.0] * 64
+
+
+def test_numpy_index_top_k():
+    embedder = HashingEmbedder()
+    ids, texts = zip(*ENTITIES)
+    index = NumpyVectorIndex(ids, texts, embedder.embed_documents(texts))
+
+    hits = index.search(embedder.embed_query("slack notifier webhook"), k=2)
+
+    assert [h["id"] for h in hits] == ["e2", "e1"]
+    assert hits[0]["distance"] <= hits[1]["distance"]
+    assert index.search(embedder.embed_query("quantum banana"), k=3) == []
+
+
+def test_lancedb_top_k(tmp_path):
+    lancedb = pytest.importorskip("lancedb")
+    embedder = HashingEmbedder()
+    ids, texts = zip(*ENTITIES)
+    db = lancedb.connect(str(tmp_path))
+    db.create_table(
+        f"{LANCEDB_CONTAINER}-{LANCEDB_TABLES['entity']}",
+        data=[{"id": i, "text": t, "vector": v} for i, t, v in zip(ids, texts, embedder.embed_documents(texts))],
+    )
+
+    indexes = open_lancedb_indexes(str(tmp_path))
+    assert set(indexes) == {"entity"}
+    assert len(indexes["entity"]) == len(ENTITIES)
+
+    retriever = VectorRetriever(embedder, indexes)
+    hits = retriever.search("account phone trigger", kinds=("entity", "text_unit"), k=3)
+
+    assert set(hits) == {"entity"}
+    assert len(hits["entity"]) == 3
+    assert hits["entity"][0]["id"] == "e4"
+    distances = [h["distance"] for h in hits["entity"]]
+    assert distances == sorted(distances)